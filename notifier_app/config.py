@@ -1,5 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 from datetime import datetime, timezone
+from .utils import normalize_email
 
 db = SQLAlchemy()
 
@@ -24,6 +26,7 @@ class UserPreferences(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String, nullable=False, index=True)
+    email_norm = db.Column(db.String, nullable=True)  # normalize_email(email)
     global_opt_out = db.Column(db.Boolean, default=False)
     show_key = db.Column(db.String, nullable=True, index=True)  # grandparentRatingKey
     show_guid = db.Column(db.String, nullable=True, index=True)  # stable show identifier
@@ -34,8 +37,15 @@ class UserPreferences(db.Model):
         db.UniqueConstraint('email', 'show_key', name='uq_email_show_key'),
         db.Index('idx_email_show_key', 'email', 'show_key'),
         db.Index('idx_email_show_guid', 'email', 'show_guid'),
+        db.Index('idx_email_norm_show_key', 'email_norm', 'show_key'),
     )
 
+    @validates('email')
+    def _sync_email_norm(self, key, value):
+        # Keep the indexed canonical copy in step with every email assignment
+        self.email_norm = normalize_email(value)
+        return value
+
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
@@ -64,6 +74,7 @@ class Notification(db.Model):
         db.UniqueConstraint('email', 'imdb_id', 'season', 'episode', name='uq_notification_imdb_id'),
         db.UniqueConstraint('email', 'plex_guid', 'season', 'episode', name='uq_notification_plex_guid'),
         db.Index('idx_email_timestamp', 'email', 'timestamp'),
+        db.Index('idx_notification_email_show_key_guid', 'email', 'show_key', 'show_guid'),
         db.Index('idx_notifications_send_batch_id', 'send_batch_id'),
         db.Index('idx_show_key_season_episode', 'show_key', 'season', 'episode'),
         db.Index('idx_show_guid', 'show_guid'),
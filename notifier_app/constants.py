@@ -6,6 +6,7 @@ NOTIFICATION_CACHE_TTL_SECONDS = 300  # 5 minutes cache for notification history
 
 # History display
 HISTORY_ENTRIES_PER_PAGE = 20
+HISTORY_PAGE_CACHE_SIZE = 32  # Rendered history pages kept while data is unchanged
 MONTHLY_STATS_MONTHS = 12  # Number of months to show in stats
 
 # Subscriptions page
@@ -15,6 +16,9 @@ INACTIVE_SHOW_THRESHOLD_DAYS = 365  # Days without notifications before a show i
 # Token expiry
 UNSUBSCRIBE_TOKEN_EXPIRY_DAYS = 30  # Increased from 7 for better UX
 UNSUBSCRIBE_TOKEN_EXPIRY_SECONDS = 86400 * UNSUBSCRIBE_TOKEN_EXPIRY_DAYS
+SUBSCRIPTION_TOKEN_MAX_AGE_SECONDS = 86400 * 7  # /subscriptions tokens are accepted for a week
+SUBSCRIPTION_TOKEN_CACHE_TTL_SECONDS = 600  # Reuse decoded /subscriptions tokens for 10 minutes
+SUBSCRIPTION_SHOW_CACHE_TTL_SECONDS = 30  # Reuse a subscriber's show list across page loads
 
 # Retry settings
 EMAIL_RETRY_ATTEMPTS = 3
@@ -38,3 +42,8 @@ TAUTULLI_WATCHED_PERCENT_THRESHOLD = 80  # Minimum percent watched to qualify as
 # Rate limiting
 RATE_LIMIT_TEST_EMAIL = "5 per hour"
 RATE_LIMIT_MANUAL_CHECK = "3 per hour"
+
+# Database schema
+SCHEMA_VERSION = 4  # Bump whenever the startup migration or backfills gain a step
+SQLITE_MMAP_SIZE_BYTES = 256 * 1024 * 1024  # Memory-map up to 256MB of the database file
+SQLITE_CACHE_SIZE_KIB = 20_000  # Page cache per connection (~20MB; default is 2MB)
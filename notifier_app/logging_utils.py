@@ -1,5 +1,6 @@
 import logging
 import os
+from logging.handlers import QueueListener, RotatingFileHandler
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -24,3 +25,65 @@ class TZFormatter(logging.Formatter):
         # Shorten logger name: "notifier_app.webapp" -> "webapp"
         record.name = record.name.rsplit('.', 1)[-1]
         return super().format(record)
+
+
+def instance_log_dir(instance_path: str) -> str:
+    """Return the directory that holds every log file for an instance path."""
+    return os.path.join(instance_path, "logs")
+
+
+def add_rotating_file_handler(logger: logging.Logger, path: str, fmt: str, **kwargs) -> None:
+    """Attach a RotatingFileHandler for ``path`` unless ``logger`` already has one."""
+    path = os.path.abspath(path)
+    if any(getattr(h, "baseFilename", None) == path for h in logger.handlers):
+        return
+    handler = RotatingFileHandler(path, **kwargs)
+    handler.setFormatter(TZFormatter(fmt))
+    logger.addHandler(handler)
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that writes records without flushing after each one.
+
+    Meant to sit behind a ``BatchingQueueListener``, which calls ``flush()``
+    once its queue drains, so a burst of records reaches the OS in one write.
+    """
+    def _open(self):
+        stream = super()._open()
+        # Track the size ourselves; tell() on a text stream would flush the batch
+        self._size = stream.tell()
+        return stream
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            # maxBytes is a byte limit, so measure the encoded record
+            size = len(msg.encode(self.stream.encoding, self.stream.errors))
+            if self.maxBytes > 0 and self._size + size >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(msg)
+            self._size += size
+        except Exception:
+            self.handleError(record)
+
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener that flushes its handlers when idle or on an error record."""
+    def handle(self, record):
+        super().handle(record)
+        if record.levelno >= logging.ERROR or self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+    def stop(self):
+        # The atexit hook may call this again after an explicit stop
+        if self._thread is None:
+            return
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+            handler.close()
@@ -3,6 +3,7 @@ import smtplib
 import requests
 import logging
 import time
+import threading
 import re
 import uuid
 from datetime import datetime, timedelta, timezone
@@ -11,11 +12,16 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
 from typing import List, Dict, Any, Set, Optional, Tuple
-from logging.handlers import RotatingFileHandler
 from cachetools import TTLCache
 
-from .logging_utils import TZFormatter
-from .utils import normalize_email, email_to_filename, redact_email
+from .logging_utils import add_rotating_file_handler, instance_log_dir
+from .utils import (
+    normalize_email,
+    email_to_filename,
+    redact_email,
+    split_title_year,
+    strip_non_alnum,
+)
 from .constants import (
     NOTIFICATION_HISTORY_LIMIT,
     NOTIFICATION_CACHE_TTL_SECONDS,
@@ -48,22 +54,35 @@ from sqlalchemy import or_
 logging.getLogger("urllib3.connectionpool").setLevel(logging.WARNING)
 notif_logger = logging.getLogger("notifications")
 notif_logger.setLevel(logging.INFO)
-notif_log_dir = os.path.join(os.path.dirname(__file__), "../instance/logs")
-os.makedirs(notif_log_dir, exist_ok=True)
-notif_log_path = os.path.join(notif_log_dir, "notifications.log")
-notif_handler = RotatingFileHandler(notif_log_path, maxBytes=GLOBAL_LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
-notif_handler.setFormatter(TZFormatter('%(asctime)s | %(message)s'))
-notif_logger.addHandler(notif_handler)
 notif_logger.propagate = False  # ✅ Prevent log from appearing in Unraid console
 
 app_logger = logging.getLogger("plex_notifier")
 app_logger.setLevel(logging.INFO)
-app_log_path = os.path.join(notif_log_dir, "app.log")
-app_handler = RotatingFileHandler(app_log_path, maxBytes=APP_LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
-app_handler.setFormatter(TZFormatter('%(asctime)s | %(levelname)s | %(name)s | %(message)s'))
-app_logger.addHandler(app_handler)
 app_logger.propagate = False
 
+
+def configure_log_dir(log_dir: str) -> None:
+    """Write notifications.log and app.log under ``log_dir``.
+
+    create_app passes its instance's log dir, the same one /history/raw and
+    /api/admin/logs read. Each distinct file gets one handler.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    add_rotating_file_handler(
+        notif_logger,
+        os.path.join(log_dir, "notifications.log"),
+        '%(asctime)s | %(message)s',
+        maxBytes=GLOBAL_LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+    )
+    add_rotating_file_handler(
+        app_logger,
+        os.path.join(log_dir, "app.log"),
+        '%(asctime)s | %(levelname)s | %(name)s | %(message)s',
+        maxBytes=APP_LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+    )
+
 # Common affirmative values returned by Tautulli for watched history entries
 AFFIRMATIVE_WATCHED_STATUSES: Set[str] = {
     "watched",
@@ -327,24 +346,25 @@ def _select_notification_to_keep(
     return keep, reason
 
 
+# Compiled once; these run for every GUID the notifier sees
+_TVDB_GUID_RE = re.compile(r"(?:tvdb|thetvdb):///?(?P<id>\d+)")
+_TMDB_GUID_RE = re.compile(r"(?:tmdb|themoviedb):///?(?P<id>\d+)")
+_IMDB_GUID_RE = re.compile(r"(?:imdb):///?(?P<id>tt\d+|\d+)")
+
+
 def _extract_show_year_from_title(title: str | None) -> tuple[str | None, int | None]:
     if not title:
         return None, None
-    year_match = re.search(r"\((\d{4})\)\s*$", title)
-    if not year_match:
+    cleaned_title, year = split_title_year(title)
+    if year is None:
         return title, None
-    try:
-        year = int(year_match.group(1))
-    except ValueError:
-        return title, None
-    cleaned_title = title[:year_match.start()].strip()
     return cleaned_title or title, year
 
 
 def _normalize_title_for_match(title: str | None) -> str:
     if not title:
         return ""
-    return re.sub(r"[^a-z0-9]+", "", title.lower())
+    return strip_non_alnum(title.lower())
 
 
 def _extract_show_guid_from_metadata(item: Any) -> List[str]:
@@ -369,13 +389,13 @@ def _extract_external_show_ids(guids: List[str]) -> Dict[str, Optional[str]]:
         lower_guid = guid.lower()
         if lower_guid.startswith("plex://") and not parsed["plex_guid"]:
             parsed["plex_guid"] = guid
-        tvdb_match = re.search(r"(?:tvdb|thetvdb):///?(?P<id>\d+)", lower_guid)
+        tvdb_match = _TVDB_GUID_RE.search(lower_guid)
         if tvdb_match and not parsed["tvdb_id"]:
             parsed["tvdb_id"] = tvdb_match.group("id")
-        tmdb_match = re.search(r"(?:tmdb|themoviedb):///?(?P<id>\d+)", lower_guid)
+        tmdb_match = _TMDB_GUID_RE.search(lower_guid)
         if tmdb_match and not parsed["tmdb_id"]:
             parsed["tmdb_id"] = tmdb_match.group("id")
-        imdb_match = re.search(r"(?:imdb):///?(?P<id>tt\d+|\d+)", lower_guid)
+        imdb_match = _IMDB_GUID_RE.search(lower_guid)
         if imdb_match and not parsed["imdb_id"]:
             parsed["imdb_id"] = imdb_match.group("id")
     return parsed
@@ -1564,10 +1584,26 @@ def reconcile_notifications(
         )
 
 
+# Held for the whole of every check_new_episodes run, scheduled or manual, so
+# two checks never overlap; /run-check takes it before queueing its job.
+check_lock = threading.Lock()
+
+
+def _run_scheduled_check(app) -> None:
+    """Run the interval check unless another check still holds check_lock."""
+    if not check_lock.acquire(blocking=False):
+        app.logger.info("⏭️ Skipping scheduled check; another check is still running")
+        return
+    try:
+        check_new_episodes(app)
+    finally:
+        check_lock.release()
+
+
 def start_scheduler(app, interval) -> BackgroundScheduler:
     sched = BackgroundScheduler()
     sched.add_job(
-        func=lambda: check_new_episodes(app),
+        func=lambda: _run_scheduled_check(app),
         trigger='interval',
         minutes=interval,
         id='check_job',
@@ -2050,7 +2086,7 @@ def check_new_episodes(app, override_interval_minutes: int = None) -> None:
             redacted_email = redact_email(email)
             if email_success:
                 # Log to file
-                user_log = get_user_logger(email)
+                user_log = get_user_logger(email, instance_log_dir(app.instance_path))
                 send_batch_id = uuid.uuid4().hex
                 for ep_payload in eps:
                     ep = ep_payload["episode"]
@@ -2090,23 +2126,24 @@ def check_new_episodes(app, override_interval_minutes: int = None) -> None:
                 current_app.logger.warning("⚠️ Could not retrieve next_run_time from scheduler.")
 
 
-def get_user_logger(email):
+def get_user_logger(email, log_dir):
     safe_filename = email_to_filename(email)
     filename = f"{safe_filename}-notification.log"
 
-    log_dir = os.path.join(os.path.dirname(__file__), "../instance/logs")
     os.makedirs(log_dir, exist_ok=True)
     log_path = os.path.join(log_dir, filename)
 
     logger_name = f"userlog.{safe_filename}"
     logger = logging.getLogger(logger_name)
     logger.propagate = False  # ✅ keep console clean
-
-    if not logger.handlers:
-        handler = RotatingFileHandler(log_path, maxBytes=USER_LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
-        handler.setFormatter(TZFormatter('%(asctime)s | %(message)s'))
-        logger.addHandler(handler)
-        logger.setLevel(logging.INFO)
+    logger.setLevel(logging.INFO)
+    add_rotating_file_handler(
+        logger,
+        log_path,
+        '%(asctime)s | %(message)s',
+        maxBytes=USER_LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+    )
 
     return logger
 
@@ -468,7 +468,10 @@ function initLogViewer() {
       }
 
       offset = nextOffset;
-      let lines = Array.isArray(data.lines) ? data.lines : [];
+      let lines = typeof data.text === 'string' && data.text ? data.text.split(/\r?\n/) : [];
+      if (data.ends_with_newline && lines.length) {
+        lines.pop(); // Empty string after the final newline
+      }
 
       if (pendingLine) {
         if (lines.length) {
@@ -1,6 +1,7 @@
 from __future__ import annotations
 import hashlib
 import re
+from functools import lru_cache
 
 
 def normalize_email(email: str | None) -> str:
@@ -15,6 +16,7 @@ def normalize_email(email: str | None) -> str:
     return email.lower().strip()
 
 
+@lru_cache(maxsize=4096)
 def email_to_filename(email: str) -> str:
     """Convert email address to a safe filename.
 
@@ -46,19 +48,31 @@ def redact_email(email: str | None) -> str:
     return f"{masked_local}@{domain}"
 
 
+_TRAILING_YEAR_RE = re.compile(r"\((\d{4})\)\s*$")
+_NON_ALNUM_RUN_RE = re.compile(r"[^a-z0-9]+")
+
+
+def split_title_year(title: str) -> tuple[str, int | None]:
+    """Split a trailing ``(YYYY)`` off ``title``; returns ``(title, year)``."""
+    year_match = _TRAILING_YEAR_RE.search(title)
+    if not year_match:
+        return title, None
+    return title[:year_match.start()].strip(), int(year_match.group(1))
+
+
+def strip_non_alnum(text: str) -> str:
+    """Drop every character of ``text`` outside lowercase a-z and 0-9."""
+    return _NON_ALNUM_RUN_RE.sub("", text)
+
+
+@lru_cache(maxsize=4096)
 def normalize_show_identity(title: str | None, year: int | None = None) -> str:
     """Create a stable identifier for a show based on title/year."""
     if not title:
         return ""
 
-    normalized_title = title.strip().lower()
-    extracted_year = None
-    year_match = re.search(r"\((\d{4})\)\s*$", normalized_title)
-    if year_match:
-        extracted_year = int(year_match.group(1))
-        normalized_title = normalized_title[:year_match.start()].strip()
-
-    normalized_title = re.sub(r"[^a-z0-9]+", "-", normalized_title).strip("-")
+    normalized_title, extracted_year = split_title_year(title.strip().lower())
+    normalized_title = _NON_ALNUM_RUN_RE.sub("-", normalized_title).strip("-")
     show_year = year or extracted_year
 
     if show_year:
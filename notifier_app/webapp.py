@@ -1,32 +1,49 @@
 import os
 import re
+import bisect
+import queue
+import atexit
+import uuid
+import hashlib
 import logging
 import threading
+import warnings
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
-from logging.handlers import RotatingFileHandler
-from collections import defaultdict
-from flask import Flask, render_template, redirect, url_for, flash, request, session, send_from_directory, jsonify
+from logging.handlers import QueueHandler
+from collections import defaultdict, OrderedDict
+from flask import Flask, render_template, redirect, url_for, flash, request, session, send_from_directory, send_file, jsonify, abort, make_response
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from itsdangerous import URLSafeTimedSerializer, BadSignature
+from cachetools import TTLCache
 from .config import db, Settings, UserPreferences, Notification, ShowIdentity
-from .utils import normalize_email, normalize_show_identity
+from .utils import normalize_email, normalize_show_identity, email_to_filename, redact_email
 from .forms import SettingsForm, TestEmailForm, ManualCheckForm, LoginForm
 from .constants import (
     HISTORY_ENTRIES_PER_PAGE,
+    HISTORY_PAGE_CACHE_SIZE,
+    SCHEMA_VERSION,
+    SQLITE_MMAP_SIZE_BYTES,
+    SQLITE_CACHE_SIZE_KIB,
     MONTHLY_STATS_MONTHS,
     SUBSCRIPTIONS_SHOWS_PER_PAGE,
     INACTIVE_SHOW_THRESHOLD_DAYS,
     RATE_LIMIT_TEST_EMAIL,
     RATE_LIMIT_MANUAL_CHECK,
+    SUBSCRIPTION_TOKEN_MAX_AGE_SECONDS,
+    SUBSCRIPTION_TOKEN_CACHE_TTL_SECONDS,
+    SUBSCRIPTION_SHOW_CACHE_TTL_SECONDS,
     APP_LOG_MAX_BYTES,
     LOG_BACKUP_COUNT,
 )
 from .notifier import (
+    check_lock,
+    configure_log_dir,
     start_scheduler,
-    _send_email,
+    _send_email_with_retry,
     check_new_episodes,
     register_debug_route,
     reconcile_user_preferences,
@@ -37,11 +54,71 @@ from .notifier import (
     _notification_identity_label,
     _select_notification_to_keep,
 )
-from .logging_utils import TZFormatter
-from sqlalchemy import inspect, text, or_, func, cast, String, literal
+from .logging_utils import TZFormatter, BatchedRotatingFileHandler, BatchingQueueListener, instance_log_dir
+from sqlalchemy import event, inspect, text, and_, or_, update, func, cast, String, literal, literal_column, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SAWarning
+from sqlalchemy.orm import Session
+
+# Sort key for shows without a notification date. Naive, like the timestamps
+# SQLite hands back, so the two always compare.
+_NEVER_NOTIFIED = datetime.min
+
+_MONTH_ABBR = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
 
 serializer = URLSafeTimedSerializer(os.environ.get("SECRET_KEY", "change-me"))
 
+# History caches key on a write generation instead of scanning the tables:
+# every committed ORM write to notifications or user_preferences, including
+# in-place edits and bulk statements, bumps it. The epoch keeps a restarted
+# process from reusing ETags handed out by the previous one.
+_HISTORY_TABLES = frozenset({"notifications", "user_preferences"})
+_history_epoch = uuid.uuid4().hex
+_history_generation = 0
+_history_generation_lock = threading.Lock()
+
+# Guard the per-app history caches create_app puts on app.config:
+# history_stats_cache holds the page aggregates (user list, per-user counts,
+# monthly totals) for the current fingerprint only; history_page_cache is a
+# bounded LRU of rendered pages keyed on (fingerprint, day, email filter, page)
+# where entries for stale fingerprints simply age out.
+_history_stats_lock = threading.Lock()
+_history_page_lock = threading.Lock()
+
+# Root logger's app.log writers, keyed on the log file path. Requests only
+# enqueue records; each listener thread owns its file handler, so disk writes
+# and rotation never block a request, and flushes once per burst rather than
+# per record. Installed once per distinct file.
+_app_log_listeners: dict[str, tuple[QueueHandler, BatchingQueueListener]] = {}
+
+# Run /run-check and /test-email jobs when no scheduler is available, one
+# single-worker executor per kind (see _fallback_pool) so a test email never
+# queues behind a whole manual check.
+_fallback_pools: dict[str, ThreadPoolExecutor] = {}
+_fallback_pools_lock = threading.Lock()
+
+# Decoded /subscriptions tokens: token -> (email, canonical email, signed at),
+# or None when the signature is invalid. Skips the HMAC check on reloads of
+# the same page; the token's age is still checked on every hit.
+_subscription_token_cache = TTLCache(maxsize=1024, ttl=SUBSCRIPTION_TOKEN_CACHE_TTL_SECONDS)
+_subscription_token_lock = threading.Lock()
+
+# Per-subscriber show maps for /subscriptions, keyed on canonical email. Only
+# the notification-derived list is cached; opt-out state is always read fresh.
+_subscription_show_cache = TTLCache(maxsize=256, ttl=SUBSCRIPTION_SHOW_CACHE_TTL_SECONDS)
+_subscription_show_lock = threading.Lock()
+
+
+def _fallback_pool(kind: str) -> ThreadPoolExecutor:
+    """Return the executor for ``kind``, creating it on first use."""
+    with _fallback_pools_lock:
+        pool = _fallback_pools.get(kind)
+        if pool is None:
+            # One worker keeps repeated clicks from spawning a thread each
+            pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"webapp-{kind}")
+            _fallback_pools[kind] = pool
+        return pool
+
 
 # 🔐 Auth helpers
 def _is_safe_next_url(target: str | None) -> bool:
@@ -99,8 +176,9 @@ def _format_episode_range_list(episodes: list[int]) -> str:
     return ", ".join(ranges)
 
 
-def _build_history_batch_summary(notifications: list[Notification]) -> str:
-    grouped_by_show: dict[str, list[Notification]] = defaultdict(list)
+def _build_history_batch_summary(notifications: list) -> str:
+    """Summarize a send batch; rows need ``show_title``, ``season`` and ``episode``."""
+    grouped_by_show: dict[str, list] = defaultdict(list)
     for notif in notifications:
         grouped_by_show[notif.show_title].append(notif)
 
@@ -130,455 +208,688 @@ def _build_history_batch_summary(notifications: list[Notification]) -> str:
     return "; ".join(show_summaries)
 
 
-def create_app():
-    log_format = '%(asctime)s | %(levelname)s | %(name)s | %(message)s'
-    # LOG_LEVEL takes precedence; fall back to DEBUG env var for backwards compatibility
-    log_level_env = os.getenv("LOG_LEVEL", "").strip()
-    if log_level_env:
-        level = _parse_log_level(log_level_env)
-    else:
-        level = logging.DEBUG if os.getenv("DEBUG", "false").lower() == "true" else logging.INFO
-    handler = logging.StreamHandler()
-    handler.setLevel(level)
-    handler.setFormatter(TZFormatter(log_format))
-    logging.basicConfig(level=logging.DEBUG, handlers=[handler])
-
-    # Suppress overly verbose logs
-    logging.getLogger("apscheduler").setLevel(logging.WARNING)
-    logging.getLogger("urllib3.connectionpool").setLevel(logging.WARNING)
-    logging.getLogger("werkzeug").setLevel(logging.WARNING)
-
-    app = Flask(__name__, instance_relative_config=True)
-    app.logger.setLevel(level)
-    # Remove Flask's default handlers to prevent duplicate console output
-    app.logger.handlers.clear()
-    log_dir = os.path.abspath(os.path.join(app.root_path, "..", "instance", "logs"))
-    os.makedirs(log_dir, exist_ok=True)
-    app_log_path = os.path.join(log_dir, "app.log")
-    app_file_handler = RotatingFileHandler(
-        app_log_path,
-        maxBytes=APP_LOG_MAX_BYTES,
-        backupCount=LOG_BACKUP_COUNT,
-    )
-    app_file_handler.setFormatter(TZFormatter(log_format))
-    root_logger = logging.getLogger()
-    if not any(
-        isinstance(existing, RotatingFileHandler)
-        and getattr(existing, "baseFilename", None) == app_log_path
-        for existing in root_logger.handlers
-    ):
-        root_logger.addHandler(app_file_handler)
-
-    @app.route('/media/<path:filename>')
-    def media_file(filename):
-        media_dir = os.path.abspath(os.path.join(app.root_path, "..", "media"))
-        return send_from_directory(media_dir, filename)
+def _load_subscription_token(token: str) -> tuple[str, str] | None:
+    """Decode an unsubscribe token into ``(email, canonical_email)``.
 
-    @app.route('/manifest.webmanifest')
-    def manifest():
-        static_dir = os.path.abspath(os.path.join(app.root_path, "static"))
-        return send_from_directory(
-            static_dir,
-            "manifest.webmanifest",
-            mimetype="application/manifest+json",
+    Only the signature check is cached; the token's age is checked again on
+    every call, so a cached token still expires on time.
+    """
+    with _subscription_token_lock:
+        cached = _subscription_token_cache.get(token, False)
+    if cached is False:
+        try:
+            email, signed_at = serializer.loads(
+                token,
+                salt="unsubscribe",
+                max_age=SUBSCRIPTION_TOKEN_MAX_AGE_SECONDS,
+                return_timestamp=True,
+            )
+            cached = (email, normalize_email(email), signed_at)
+        except BadSignature:
+            cached = None
+        with _subscription_token_lock:
+            _subscription_token_cache[token] = cached
+    if cached is None:
+        return None
+    email, canon, signed_at = cached
+    if datetime.now(timezone.utc) - signed_at > timedelta(seconds=SUBSCRIPTION_TOKEN_MAX_AGE_SECONDS):
+        return None
+    return email, canon
+
+
+def _load_subscription_shows(canon: str) -> dict[str, dict]:
+    """Return the show map for a subscriber's /subscriptions page.
+
+    Maps a show id (GUID, or rating key when no GUID is known) to its title,
+    identifiers and last notification time, ordered most recently notified
+    first. Cached briefly per subscriber so paging and searching through the
+    list does not regroup or re-sort their notifications.
+    """
+    with _subscription_show_lock:
+        cached = _subscription_show_cache.get(canon)
+    if cached is not None:
+        return cached
+
+    # Get shows from database notifications (primary source) with last notification date
+    show_map = {}  # key -> {title, last_notified} mapping
+    show_key_lookup = {}
+
+    # Get most recent notification for each show
+    show_latest = (
+        db.session.query(
+            Notification.show_key,
+            Notification.show_guid,
+            Notification.show_title,
+            func.max(Notification.timestamp).label('last_notified')
         )
-
-    @app.route('/icons/<path:filename>')
-    def icon_file(filename):
-        icons_dir = os.path.abspath(os.path.join(app.root_path, "static", "icons"))
-        return send_from_directory(icons_dir, filename)
-
-    # Validate SECRET_KEY
-    secret_key = os.environ.get('SECRET_KEY', 'change-me')
-    if secret_key == 'change-me':
-        app.logger.error("=" * 80)
-        app.logger.error("SECURITY ERROR: SECRET_KEY is set to default 'change-me' value!")
-        app.logger.error("Please set a secure SECRET_KEY environment variable.")
-        app.logger.error("You can generate one with: python -c 'import secrets; print(secrets.token_hex(32))'")
-        app.logger.error("=" * 80)
-        raise ValueError("Insecure SECRET_KEY detected. Application will not start.")
-
-    if len(secret_key) < 32:
-        app.logger.warning("!" * 80)
-        app.logger.warning("WARNING: SECRET_KEY is shorter than recommended (32+ characters)")
-        app.logger.warning("!" * 80)
-
-    os.makedirs(app.instance_path, exist_ok=True)
-    db_path = os.path.join(app.instance_path, 'config.sqlite3')
-    if not os.path.exists(db_path):
-        open(db_path, 'a').close()
-
-    app.config.from_mapping(
-        SECRET_KEY=secret_key,
-        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}",
-        SQLALCHEMY_TRACK_MODIFICATIONS=False,
-        SESSION_COOKIE_HTTPONLY=True,
-        SESSION_COOKIE_SAMESITE="Lax",
-        PERMANENT_SESSION_LIFETIME=timedelta(
-            hours=int(os.environ.get("SESSION_LIFETIME_HOURS", "12"))
-        ),
+        .filter_by(email=canon)
+        .group_by(Notification.show_key, Notification.show_guid, Notification.show_title)
+        .all()
     )
 
-    session_cookie_secure = os.environ.get("SESSION_COOKIE_SECURE")
-    if session_cookie_secure is not None:
-        app.config["SESSION_COOKIE_SECURE"] = session_cookie_secure.lower() == "true"
-
-    # Initialize rate limiter
-    limiter = Limiter(
-        app=app,
-        key_func=get_remote_address,
-        default_limits=["200 per day", "50 per hour"],
-        storage_uri="memory://",
+    def _merge_show_entry(target, source):
+        if source.get('last_notified'):
+            if not target.get('last_notified') or source['last_notified'] > target['last_notified']:
+                target['last_notified'] = source['last_notified']
+        for key in ('show_guid', 'show_key'):
+            if source.get(key) and not target.get(key):
+                target[key] = source[key]
+        if source.get('title') and not target.get('title'):
+            target['title'] = source['title']
+
+    def _resolve_existing_show_id(show_guid, show_key):
+        if show_guid and show_guid in show_map:
+            return show_guid
+        if show_key and show_key in show_key_lookup:
+            return show_key_lookup[show_key]
+        if show_key and show_key in show_map:
+            return show_key
+        return None
+
+    def _rekey_entry(existing_key, new_key):
+        if existing_key == new_key:
+            return
+        existing_entry = show_map.pop(existing_key)
+        if new_key in show_map:
+            _merge_show_entry(show_map[new_key], existing_entry)
+        else:
+            show_map[new_key] = existing_entry
+        if existing_entry.get("show_key"):
+            show_key_lookup[existing_entry["show_key"]] = new_key
+    for show_key, show_guid, show_title, last_notified in show_latest:
+        existing_id = _resolve_existing_show_id(show_guid, show_key)
+        if show_guid and existing_id and existing_id != show_guid:
+            _rekey_entry(existing_id, show_guid)
+            existing_id = show_guid
+        show_id = existing_id or show_guid or show_key
+        if not show_id:
+            continue
+        current_entry = {
+            'title': show_title,
+            'last_notified': last_notified,
+            'show_guid': show_guid,
+            'show_key': show_key,
+        }
+        if show_id in show_map:
+            _merge_show_entry(show_map[show_id], current_entry)
+        else:
+            show_map[show_id] = current_entry
+        if show_key:
+            show_key_lookup[show_key] = show_id
+
+    # Sort once per cache fill; shows without a date go last
+    show_map = dict(sorted(
+        show_map.items(),
+        key=lambda item: item[1]['last_notified'] or _NEVER_NOTIFIED,
+        reverse=True,
+    ))
+    with _subscription_show_lock:
+        _subscription_show_cache[canon] = show_map
+    return show_map
+
+
+def _fmt_dt(dt: datetime | None, tz: ZoneInfo | None = None) -> str:
+    """Format a history timestamp as e.g. ``01/31/2024 7:05pm CST``."""
+    if not dt:
+        return ""
+    # Database stores timestamps as naive UTC datetimes
+    # First mark as UTC, then convert to local timezone
+    if tz and dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc).astimezone(tz)
+    # One strftime pass; %Z is empty for naive datetimes
+    date, hour, minute, ampm, zone = dt.strftime("%m/%d/%Y|%I|%M|%p|%Z").split("|")
+    return f"{date} {hour.lstrip('0') or '0'}:{minute}{ampm.lower()} {zone}".strip()
+
+
+@event.listens_for(Session, "after_flush")
+def _note_history_flush(session: Session, flush_context) -> None:
+    """Flag the transaction if the unit of work touched a history table."""
+    changed = (*session.new, *session.dirty, *session.deleted)
+    if any(getattr(obj, "__tablename__", None) in _HISTORY_TABLES for obj in changed):
+        session.info["history_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_history_statement(orm_execute_state) -> None:
+    """Flag the transaction for bulk INSERT/UPDATE/DELETE on a history table."""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if getattr(table, "name", None) in _HISTORY_TABLES:
+            orm_execute_state.session.info["history_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_history_generation(session: Session) -> None:
+    # Bump only once the write is visible, so a page rendered from the old
+    # rows is never cached under the new generation
+    global _history_generation
+    if session.info.pop("history_changed", False):
+        with _history_generation_lock:
+            _history_generation += 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_history_changes(session: Session) -> None:
+    session.info.pop("history_changed", None)
+
+
+def _history_fingerprint() -> tuple:
+    """Return a fingerprint that changes after every committed history write."""
+    with _history_generation_lock:
+        return (_history_epoch, _history_generation)
+
+
+def _load_history_stats(
+    fingerprint: tuple, today: datetime, cache: dict
+) -> tuple[list[str], dict[str, int], list[tuple[str, int]]]:
+    """Return ``(users, user_counts, monthly_totals)`` for the history page.
+
+    Results are memoized in ``cache`` until the notification or preference
+    tables change (or the day rolls over, which moves the monthly stats window).
+    """
+    cache_key = (fingerprint, today.date())
+    with _history_stats_lock:
+        cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Users with preferences (email_norm is already canonical) or notifications,
+    # each with their notification count, sorted, in a single round-trip
+    user_emails = (
+        db.session.query(UserPreferences.email_norm.label("email"))
+        .union(db.session.query(Notification.email))
+        .subquery()
     )
-
-    db.init_app(app)
-
-    with app.app_context():
-        # Create all tables (will only create if they don't exist)
-        db.create_all()
-
-        # Handle legacy schema migrations
-        inspector = inspect(db.engine)
-
-        # Migrate settings table if needed
-        if 'settings' in inspector.get_table_names():
-            existing_cols = {c['name'] for c in inspector.get_columns('settings')}
-            with db.engine.begin() as conn:
-                if 'notify_interval' not in existing_cols:
-                    conn.execute(text('ALTER TABLE settings ADD COLUMN notify_interval INTEGER DEFAULT 30'))
-                    app.logger.info("Added notify_interval column to settings table")
-                if 'base_url' not in existing_cols:
-                    conn.execute(text('ALTER TABLE settings ADD COLUMN base_url VARCHAR'))
-                    app.logger.info("Added base_url column to settings table")
-        # Migrate user_preferences table to add unique constraint if it doesn't exist
-        if 'user_preferences' in inspector.get_table_names():
-            try:
-                constraints = inspector.get_unique_constraints('user_preferences')
-                constraint_names = [c['name'] for c in constraints]
-                if 'uq_email_show_key' not in constraint_names:
-                    if db.engine.dialect.name == "sqlite":
-                        try:
-                            existing_cols = {c['name'] for c in inspector.get_columns('user_preferences')}
-                            has_show_guid = 'show_guid' in existing_cols
-                            order_clause = (
-                                "(show_guid IS NOT NULL) DESC, id DESC"
-                                if has_show_guid
-                                else "id DESC"
-                            )
-                            show_guid_select = "show_guid" if has_show_guid else "NULL AS show_guid"
-                            with db.engine.begin() as conn:
-                                conn.execute(text("""
-                                    CREATE TABLE user_preferences_new (
-                                        id INTEGER PRIMARY KEY,
-                                        email VARCHAR NOT NULL,
-                                        global_opt_out BOOLEAN,
-                                        show_key VARCHAR,
-                                        show_guid VARCHAR,
-                                        show_opt_out BOOLEAN,
-                                        CONSTRAINT uq_email_show_key UNIQUE (email, show_key)
-                                    )
-                                """))
-                                conn.execute(text("""
-                                    INSERT INTO user_preferences_new (
-                                        id,
-                                        email,
-                                        global_opt_out,
-                                        show_key,
-                                        show_guid,
-                                        show_opt_out
-                                    )
-                                    SELECT
-                                        id,
-                                        email,
-                                        global_opt_out,
-                                        show_key,
-                                        show_guid,
-                                        show_opt_out
-                                    FROM (
-                                        SELECT
-                                            id,
-                                            email,
-                                            global_opt_out,
-                                            show_key,
-                                            {show_guid_select},
-                                            show_opt_out,
-                                            ROW_NUMBER() OVER (
-                                                PARTITION BY email, show_key
-                                                ORDER BY {order_clause}
-                                            ) AS row_rank
-                                        FROM user_preferences
-                                    )
-                                    WHERE row_rank = 1
-                                """.format(
-                                    show_guid_select=show_guid_select,
-                                    order_clause=order_clause,
-                                )))
-                                conn.execute(text("DROP TABLE user_preferences"))
-                                conn.execute(text("ALTER TABLE user_preferences_new RENAME TO user_preferences"))
-                                conn.execute(text(
-                                    "CREATE INDEX idx_email_show_key ON user_preferences (email, show_key)"
-                                ))
-                                conn.execute(text(
-                                    "CREATE INDEX idx_email_show_guid ON user_preferences (email, show_guid)"
-                                ))
-                            app.logger.info(
-                                "Rebuilt user_preferences table to add missing unique constraint uq_email_show_key."
-                            )
-                            inspector = inspect(db.engine)
-                        except Exception as exc:
-                            app.logger.warning(
-                                f"Failed to rebuild user_preferences table for unique constraint migration; rolling back. {exc}"
-                            )
-                    else:
-                        app.logger.warning(
-                            "Legacy user_preferences table detected without uq_email_show_key. "
-                            "Manual migration required for non-SQLite database."
-                        )
-            except Exception as e:
-                app.logger.warning(f"Could not check user_preferences constraints: {e}")
-
-        # Add show_guid columns if missing
+    notification_counts = (
+        db.session.query(Notification.email, func.count(Notification.id).label("total"))
+        .group_by(Notification.email)
+        .subquery()
+    )
+    user_rows = (
+        db.session.query(user_emails.c.email, func.coalesce(notification_counts.c.total, 0))
+        .outerjoin(notification_counts, notification_counts.c.email == user_emails.c.email)
+        .filter(user_emails.c.email.isnot(None), user_emails.c.email != "")
+        .order_by(user_emails.c.email)
+        .all()
+    )
+    users = [email for email, _ in user_rows]
+    user_counts = dict(user_rows)
+
+    # Calculate monthly stats from database
+    months_ago_limit = MONTHLY_STATS_MONTHS
+    cutoff_year, cutoff_month = divmod(today.year * 12 + today.month - 1 - months_ago_limit, 12)
+    cutoff = f"{cutoff_year:04d}-{cutoff_month + 1:02d}"
+
+    # Inline the format so the expression matches idx_notifications_month and
+    # SQLite can range-scan and group straight off that index
+    month_expr = db.func.strftime(literal_column("'%Y-%m'"), Notification.timestamp)
+    monthly_stats = db.session.query(
+        month_expr.label('month'),
+        db.func.count(Notification.id).label('count')
+    ).filter(
+        month_expr >= cutoff
+    ).group_by('month').all()
+
+    # month is already 'YYYY-MM'; slice it rather than round-trip through strptime
+    monthly_totals = [
+        (f"{_MONTH_ABBR[int(month[5:7]) - 1]} {month[:4]}", count)
+        for month, count in sorted(monthly_stats)
+    ]
+
+    result = (users, user_counts, monthly_totals)
+    with _history_stats_lock:
+        cache.clear()
+        cache[cache_key] = result
+    return result
+
+
+def _apply_sqlite_pragmas(dbapi_conn, connection_record) -> None:
+    """Tune each new SQLite connection for a read-heavy web UI.
+
+    WAL lets the history and subscriptions pages keep reading while the
+    scheduler writes notifications; NORMAL sync is safe under WAL and avoids
+    an fsync per commit. A larger page cache keeps the hot notifications pages
+    in memory between requests.
+    """
+    cursor = dbapi_conn.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_BYTES}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def _migrate_schema(app: Flask) -> bool:
+    """Bring a database created by an older release up to the current schema.
+
+    Returns False if any step was skipped or failed, so the caller does not
+    stamp the database as current and the migration is retried next start.
+    """
+    complete = True
+    inspector = inspect(db.engine)
+
+    # Migrate settings table if needed
+    if 'settings' in inspector.get_table_names():
+        # Probe and alter in one transaction; PRAGMA skips reflection overhead
         with db.engine.begin() as conn:
-            if 'notifications' in inspector.get_table_names():
-                existing_cols = {c['name'] for c in inspector.get_columns('notifications')}
-                if 'show_guid' not in existing_cols:
-                    conn.execute(text('ALTER TABLE notifications ADD COLUMN show_guid VARCHAR'))
-                    app.logger.info("Added show_guid column to notifications table")
-                notification_columns_to_add = {
-                    "send_batch_id": "VARCHAR",
-                    "tvdb_id": "VARCHAR",
-                    "tmdb_id": "VARCHAR",
-                    "imdb_id": "VARCHAR",
-                    "plex_guid": "VARCHAR",
-                }
-                for column_name, column_type in notification_columns_to_add.items():
-                    if column_name not in existing_cols:
-                        conn.execute(
-                            text(f'ALTER TABLE notifications ADD COLUMN {column_name} {column_type}')
-                        )
-                        app.logger.info(
-                            "Added %s column to notifications table",
-                            column_name,
-                        )
-                existing_indexes = {idx["name"] for idx in inspector.get_indexes("notifications")}
-                if "idx_notifications_send_batch_id" not in existing_indexes:
-                    conn.execute(
-                        text(
-                            "CREATE INDEX idx_notifications_send_batch_id "
-                            "ON notifications (send_batch_id)"
-                        )
-                    )
-                    app.logger.info("Added idx_notifications_send_batch_id index to notifications table")
-            if 'user_preferences' in inspector.get_table_names():
-                existing_cols = {c['name'] for c in inspector.get_columns('user_preferences')}
-                if 'show_guid' not in existing_cols:
-                    conn.execute(text('ALTER TABLE user_preferences ADD COLUMN show_guid VARCHAR'))
-                    app.logger.info("Added show_guid column to user_preferences table")
-        # Migrate show_identities table
-        if 'show_identities' not in inspector.get_table_names():
-            ShowIdentity.__table__.create(db.engine)
-            app.logger.info("Created show_identities table")
-            inspector = inspect(db.engine)
-        if 'show_identities' in inspector.get_table_names():
-            existing_cols = {c['name'] for c in inspector.get_columns('show_identities')}
-            columns_to_add = {
-                "show_guid": "VARCHAR",
-                "show_key": "VARCHAR",
-                "tvdb_id": "VARCHAR",
-                "tmdb_id": "VARCHAR",
-                "imdb_id": "VARCHAR",
-                "plex_guid": "VARCHAR",
-                "plex_rating_key": "VARCHAR",
-                "title": "VARCHAR",
-                "year": "INTEGER",
-                "fingerprint": "VARCHAR",
-            }
-            with db.engine.begin() as conn:
-                for column_name, column_type in columns_to_add.items():
-                    if column_name not in existing_cols:
-                        conn.execute(
-                            text(f'ALTER TABLE show_identities ADD COLUMN {column_name} {column_type}')
-                        )
-                        app.logger.info(
-                            "Added %s column to show_identities table",
-                            column_name,
+            existing_cols = {row[1] for row in conn.execute(text("PRAGMA table_info(settings)"))}
+            if 'notify_interval' not in existing_cols:
+                conn.execute(text('ALTER TABLE settings ADD COLUMN notify_interval INTEGER DEFAULT 30'))
+                app.logger.info("Added notify_interval column to settings table")
+            if 'base_url' not in existing_cols:
+                conn.execute(text('ALTER TABLE settings ADD COLUMN base_url VARCHAR'))
+                app.logger.info("Added base_url column to settings table")
+    # Migrate user_preferences table to add unique constraint if it doesn't exist
+    if 'user_preferences' in inspector.get_table_names():
+        try:
+            constraints = inspector.get_unique_constraints('user_preferences')
+            constraint_names = [c['name'] for c in constraints]
+            if 'uq_email_show_key' not in constraint_names:
+                if db.engine.dialect.name == "sqlite":
+                    try:
+                        existing_cols = {c['name'] for c in inspector.get_columns('user_preferences')}
+                        has_show_guid = 'show_guid' in existing_cols
+                        order_clause = (
+                            "(show_guid IS NOT NULL) DESC, id DESC"
+                            if has_show_guid
+                            else "id DESC"
                         )
-                conn.execute(
-                    text("CREATE INDEX IF NOT EXISTS ix_show_identities_show_guid ON show_identities (show_guid)")
-                )
-                conn.execute(
-                    text("CREATE INDEX IF NOT EXISTS ix_show_identities_show_key ON show_identities (show_key)")
-                )
-                conn.execute(
-                    text("CREATE INDEX IF NOT EXISTS ix_show_identities_fingerprint ON show_identities (fingerprint)")
-                )
-                conn.execute(
-                    text("CREATE INDEX IF NOT EXISTS idx_show_guid_key ON show_identities (show_guid, show_key)")
-                )
-        # Migrate notifications table to stable-identifier unique constraints
-        if 'notifications' in inspector.get_table_names():
-            try:
-                constraints = inspector.get_unique_constraints('notifications')
-                constraint_names = {c['name'] for c in constraints}
-                expected_constraints = {
-                    "uq_notification_show_guid",
-                    "uq_notification_tvdb_id",
-                    "uq_notification_tmdb_id",
-                    "uq_notification_imdb_id",
-                    "uq_notification_plex_guid",
-                }
-                if not expected_constraints.issubset(constraint_names):
-                    if db.engine.dialect.name == "sqlite":
-                        notifications = Notification.query.order_by(Notification.id).all()
-                        deduped: dict[tuple[str, int, int, Optional[str]], Notification] = {}
-                        for notif in notifications:
-                            identity_label = _notification_identity_label(
-                                show_guid=str(notif.show_guid) if notif.show_guid else None,
-                                tvdb_id=str(notif.tvdb_id) if notif.tvdb_id else None,
-                                tmdb_id=str(notif.tmdb_id) if notif.tmdb_id else None,
-                                imdb_id=str(notif.imdb_id) if notif.imdb_id else None,
-                                plex_guid=str(notif.plex_guid) if notif.plex_guid else None,
-                                show_key=str(notif.show_key) if notif.show_key else None,
-                            )
-                            if not identity_label:
-                                title, year = _extract_show_year_from_title(notif.show_title)
-                                fallback = normalize_show_identity(title or notif.show_title, year)
-                                if fallback:
-                                    identity_label = f"guid:{fallback}"
-                            if not identity_label and notif.show_key:
-                                identity_label = f"key:{notif.show_key}"
-                            if not identity_label:
-                                identity_label = f"id:{notif.id}"
-                            identity_key = (notif.email, notif.season, notif.episode, identity_label)
-                            existing = deduped.get(identity_key)
-                            if not existing:
-                                deduped[identity_key] = notif
-                                continue
-                            existing_score = _notification_completeness_score(existing)
-                            candidate_score = _notification_completeness_score(notif)
-                            if candidate_score > existing_score:
-                                deduped[identity_key] = notif
-                                continue
-                            if candidate_score < existing_score:
-                                continue
-                            existing_ts = existing.timestamp or datetime.min.replace(tzinfo=timezone.utc)
-                            candidate_ts = notif.timestamp or datetime.min.replace(tzinfo=timezone.utc)
-                            if candidate_ts > existing_ts:
-                                deduped[identity_key] = notif
+                        show_guid_select = "show_guid" if has_show_guid else "NULL AS show_guid"
                         with db.engine.begin() as conn:
                             conn.execute(text("""
-                                CREATE TABLE notifications_new (
+                                CREATE TABLE user_preferences_new (
                                     id INTEGER PRIMARY KEY,
                                     email VARCHAR NOT NULL,
-                                    show_title VARCHAR NOT NULL,
-                                    show_key VARCHAR NOT NULL,
+                                    global_opt_out BOOLEAN,
+                                    show_key VARCHAR,
                                     show_guid VARCHAR,
-                                    tvdb_id VARCHAR,
-                                    tmdb_id VARCHAR,
-                                    imdb_id VARCHAR,
-                                    plex_guid VARCHAR,
-                                    season INTEGER NOT NULL,
-                                    episode INTEGER NOT NULL,
-                                    episode_title VARCHAR,
-                                    episode_key VARCHAR,
-                                    timestamp DATETIME NOT NULL,
-                                    CONSTRAINT uq_notification_show_guid UNIQUE (email, show_guid, season, episode),
-                                    CONSTRAINT uq_notification_tvdb_id UNIQUE (email, tvdb_id, season, episode),
-                                    CONSTRAINT uq_notification_tmdb_id UNIQUE (email, tmdb_id, season, episode),
-                                    CONSTRAINT uq_notification_imdb_id UNIQUE (email, imdb_id, season, episode),
-                                    CONSTRAINT uq_notification_plex_guid UNIQUE (email, plex_guid, season, episode)
+                                    show_opt_out BOOLEAN,
+                                    CONSTRAINT uq_email_show_key UNIQUE (email, show_key)
                                 )
                             """))
-                            insert_stmt = text("""
-                                INSERT INTO notifications_new (
+                            conn.execute(text("""
+                                INSERT INTO user_preferences_new (
                                     id,
                                     email,
-                                    show_title,
+                                    global_opt_out,
                                     show_key,
                                     show_guid,
-                                    tvdb_id,
-                                    tmdb_id,
-                                    imdb_id,
-                                    plex_guid,
-                                    season,
-                                    episode,
-                                    episode_title,
-                                    episode_key,
-                                    timestamp
+                                    show_opt_out
                                 )
-                                VALUES (
-                                    :id,
-                                    :email,
-                                    :show_title,
-                                    :show_key,
-                                    :show_guid,
-                                    :tvdb_id,
-                                    :tmdb_id,
-                                    :imdb_id,
-                                    :plex_guid,
-                                    :season,
-                                    :episode,
-                                    :episode_title,
-                                    :episode_key,
-                                    :timestamp
+                                SELECT
+                                    id,
+                                    email,
+                                    global_opt_out,
+                                    show_key,
+                                    show_guid,
+                                    show_opt_out
+                                FROM (
+                                    SELECT
+                                        id,
+                                        email,
+                                        global_opt_out,
+                                        show_key,
+                                        {show_guid_select},
+                                        show_opt_out,
+                                        ROW_NUMBER() OVER (
+                                            PARTITION BY email, show_key
+                                            ORDER BY {order_clause}
+                                        ) AS row_rank
+                                    FROM user_preferences
                                 )
-                            """)
-                            for notif in deduped.values():
-                                conn.execute(insert_stmt, {
-                                    "id": notif.id,
-                                    "email": notif.email,
-                                    "show_title": notif.show_title,
-                                    "show_key": notif.show_key,
-                                    "show_guid": notif.show_guid,
-                                    "tvdb_id": notif.tvdb_id,
-                                    "tmdb_id": notif.tmdb_id,
-                                    "imdb_id": notif.imdb_id,
-                                    "plex_guid": notif.plex_guid,
-                                    "season": notif.season,
-                                    "episode": notif.episode,
-                                    "episode_title": notif.episode_title,
-                                    "episode_key": notif.episode_key,
-                                    "timestamp": notif.timestamp,
-                                })
-                            conn.execute(text("DROP TABLE notifications"))
-                            conn.execute(text("ALTER TABLE notifications_new RENAME TO notifications"))
-                            conn.execute(text(
-                                "CREATE INDEX idx_email_timestamp ON notifications (email, timestamp)"
-                            ))
-                            conn.execute(text(
-                                "CREATE INDEX idx_show_key_season_episode ON notifications (show_key, season, episode)"
-                            ))
-                            conn.execute(text(
-                                "CREATE INDEX idx_show_guid ON notifications (show_guid)"
-                            ))
-                            conn.execute(text(
-                                "CREATE INDEX idx_notification_tvdb_id ON notifications (tvdb_id)"
-                            ))
-                            conn.execute(text(
-                                "CREATE INDEX idx_notification_tmdb_id ON notifications (tmdb_id)"
-                            ))
+                                WHERE row_rank = 1
+                            """.format(
+                                show_guid_select=show_guid_select,
+                                order_clause=order_clause,
+                            )))
+                            conn.execute(text("DROP TABLE user_preferences"))
+                            conn.execute(text("ALTER TABLE user_preferences_new RENAME TO user_preferences"))
                             conn.execute(text(
-                                "CREATE INDEX idx_notification_imdb_id ON notifications (imdb_id)"
+                                "CREATE INDEX idx_email_show_key ON user_preferences (email, show_key)"
                             ))
                             conn.execute(text(
-                                "CREATE INDEX idx_notification_plex_guid ON notifications (plex_guid)"
+                                "CREATE INDEX idx_email_show_guid ON user_preferences (email, show_guid)"
                             ))
                         app.logger.info(
-                            "Rebuilt notifications table with stable-identifier unique constraints."
+                            "Rebuilt user_preferences table to add missing unique constraint uq_email_show_key."
                         )
                         inspector = inspect(db.engine)
-                    else:
+                    except Exception as exc:
                         app.logger.warning(
-                            "Legacy notifications table detected without stable unique constraints. "
-                            "Manual migration required for non-SQLite database."
+                            f"Failed to rebuild user_preferences table for unique constraint migration; rolling back. {exc}"
                         )
-            except Exception as exc:
-                app.logger.warning(f"Could not check notifications constraints: {exc}")
-        # Backfill notification identifiers from show identities when possible
+                        complete = False
+                else:
+                    app.logger.warning(
+                        "Legacy user_preferences table detected without uq_email_show_key. "
+                        "Manual migration required for non-SQLite database."
+                    )
+                    complete = False
+        except Exception as e:
+            app.logger.warning(f"Could not check user_preferences constraints: {e}")
+            complete = False
+
+    # Add show_guid columns if missing
+    with db.engine.begin() as conn:
+        if 'notifications' in inspector.get_table_names():
+            existing_cols = {c['name'] for c in inspector.get_columns('notifications')}
+            if 'show_guid' not in existing_cols:
+                conn.execute(text('ALTER TABLE notifications ADD COLUMN show_guid VARCHAR'))
+                app.logger.info("Added show_guid column to notifications table")
+            notification_columns_to_add = {
+                "send_batch_id": "VARCHAR",
+                "tvdb_id": "VARCHAR",
+                "tmdb_id": "VARCHAR",
+                "imdb_id": "VARCHAR",
+                "plex_guid": "VARCHAR",
+            }
+            for column_name, column_type in notification_columns_to_add.items():
+                if column_name not in existing_cols:
+                    conn.execute(
+                        text(f'ALTER TABLE notifications ADD COLUMN {column_name} {column_type}')
+                    )
+                    app.logger.info(
+                        "Added %s column to notifications table",
+                        column_name,
+                    )
+            existing_indexes = {idx["name"] for idx in inspector.get_indexes("notifications")}
+            if "idx_notifications_send_batch_id" not in existing_indexes:
+                conn.execute(
+                    text(
+                        "CREATE INDEX idx_notifications_send_batch_id "
+                        "ON notifications (send_batch_id)"
+                    )
+                )
+                app.logger.info("Added idx_notifications_send_batch_id index to notifications table")
+            # History filters on email and orders by timestamp; health and the
+            # monthly stats range-scan timestamp; /subscriptions groups a user's
+            # rows by show_key and show_guid. Older databases may lack these.
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_email_timestamp ON notifications (email, timestamp)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_notifications_timestamp ON notifications (timestamp)"
+            ))
+            # Superseded by the (email, show_key, show_guid) index below
+            conn.execute(text("DROP INDEX IF EXISTS idx_notification_email_show_key"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_notification_email_show_key_guid "
+                "ON notifications (email, show_key, show_guid)"
+            ))
+            if db.engine.dialect.name == "sqlite":
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS idx_notifications_month "
+                    "ON notifications (strftime('%Y-%m', timestamp))"
+                ))
+        if 'user_preferences' in inspector.get_table_names():
+            existing_cols = {c['name'] for c in inspector.get_columns('user_preferences')}
+            if 'show_guid' not in existing_cols:
+                conn.execute(text('ALTER TABLE user_preferences ADD COLUMN show_guid VARCHAR'))
+                app.logger.info("Added show_guid column to user_preferences table")
+            if 'email_norm' not in existing_cols:
+                conn.execute(text('ALTER TABLE user_preferences ADD COLUMN email_norm VARCHAR'))
+                app.logger.info("Added email_norm column to user_preferences table")
+            # Redundant with the (email_norm, show_key) index below
+            conn.execute(text("DROP INDEX IF EXISTS ix_user_preferences_email_norm"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_email_norm_show_key ON user_preferences (email_norm, show_key)"
+            ))
+    # Migrate show_identities table
+    if 'show_identities' not in inspector.get_table_names():
+        ShowIdentity.__table__.create(db.engine)
+        app.logger.info("Created show_identities table")
+        inspector = inspect(db.engine)
+    if 'show_identities' in inspector.get_table_names():
+        existing_cols = {c['name'] for c in inspector.get_columns('show_identities')}
+        columns_to_add = {
+            "show_guid": "VARCHAR",
+            "show_key": "VARCHAR",
+            "tvdb_id": "VARCHAR",
+            "tmdb_id": "VARCHAR",
+            "imdb_id": "VARCHAR",
+            "plex_guid": "VARCHAR",
+            "plex_rating_key": "VARCHAR",
+            "title": "VARCHAR",
+            "year": "INTEGER",
+            "fingerprint": "VARCHAR",
+        }
+        with db.engine.begin() as conn:
+            for column_name, column_type in columns_to_add.items():
+                if column_name not in existing_cols:
+                    conn.execute(
+                        text(f'ALTER TABLE show_identities ADD COLUMN {column_name} {column_type}')
+                    )
+                    app.logger.info(
+                        "Added %s column to show_identities table",
+                        column_name,
+                    )
+            conn.execute(
+                text("CREATE INDEX IF NOT EXISTS ix_show_identities_show_guid ON show_identities (show_guid)")
+            )
+            conn.execute(
+                text("CREATE INDEX IF NOT EXISTS ix_show_identities_show_key ON show_identities (show_key)")
+            )
+            conn.execute(
+                text("CREATE INDEX IF NOT EXISTS ix_show_identities_fingerprint ON show_identities (fingerprint)")
+            )
+            conn.execute(
+                text("CREATE INDEX IF NOT EXISTS idx_show_guid_key ON show_identities (show_guid, show_key)")
+            )
+    # Migrate notifications table to stable-identifier unique constraints
+    if 'notifications' in inspector.get_table_names():
         try:
-            notifications = Notification.query.all()
-            pending_updates = 0
-            batch_size = 100
+            constraints = inspector.get_unique_constraints('notifications')
+            constraint_names = {c['name'] for c in constraints}
+            expected_constraints = {
+                "uq_notification_show_guid",
+                "uq_notification_tvdb_id",
+                "uq_notification_tmdb_id",
+                "uq_notification_imdb_id",
+                "uq_notification_plex_guid",
+            }
+            if not expected_constraints.issubset(constraint_names):
+                if db.engine.dialect.name == "sqlite":
+                    notifications = Notification.query.order_by(Notification.id).all()
+                    deduped: dict[tuple[str, int, int, Optional[str]], Notification] = {}
+                    for notif in notifications:
+                        identity_label = _notification_identity_label(
+                            show_guid=str(notif.show_guid) if notif.show_guid else None,
+                            tvdb_id=str(notif.tvdb_id) if notif.tvdb_id else None,
+                            tmdb_id=str(notif.tmdb_id) if notif.tmdb_id else None,
+                            imdb_id=str(notif.imdb_id) if notif.imdb_id else None,
+                            plex_guid=str(notif.plex_guid) if notif.plex_guid else None,
+                            show_key=str(notif.show_key) if notif.show_key else None,
+                        )
+                        if not identity_label:
+                            title, year = _extract_show_year_from_title(notif.show_title)
+                            fallback = normalize_show_identity(title or notif.show_title, year)
+                            if fallback:
+                                identity_label = f"guid:{fallback}"
+                        if not identity_label and notif.show_key:
+                            identity_label = f"key:{notif.show_key}"
+                        if not identity_label:
+                            identity_label = f"id:{notif.id}"
+                        identity_key = (notif.email, notif.season, notif.episode, identity_label)
+                        existing = deduped.get(identity_key)
+                        if not existing:
+                            deduped[identity_key] = notif
+                            continue
+                        existing_score = _notification_completeness_score(existing)
+                        candidate_score = _notification_completeness_score(notif)
+                        if candidate_score > existing_score:
+                            deduped[identity_key] = notif
+                            continue
+                        if candidate_score < existing_score:
+                            continue
+                        existing_ts = existing.timestamp or datetime.min.replace(tzinfo=timezone.utc)
+                        candidate_ts = notif.timestamp or datetime.min.replace(tzinfo=timezone.utc)
+                        if candidate_ts > existing_ts:
+                            deduped[identity_key] = notif
+                    with db.engine.begin() as conn:
+                        conn.execute(text("""
+                            CREATE TABLE notifications_new (
+                                id INTEGER PRIMARY KEY,
+                                email VARCHAR NOT NULL,
+                                show_title VARCHAR NOT NULL,
+                                show_key VARCHAR NOT NULL,
+                                show_guid VARCHAR,
+                                tvdb_id VARCHAR,
+                                tmdb_id VARCHAR,
+                                imdb_id VARCHAR,
+                                plex_guid VARCHAR,
+                                send_batch_id VARCHAR,
+                                season INTEGER NOT NULL,
+                                episode INTEGER NOT NULL,
+                                episode_title VARCHAR,
+                                episode_key VARCHAR,
+                                timestamp DATETIME NOT NULL,
+                                CONSTRAINT uq_notification_show_guid UNIQUE (email, show_guid, season, episode),
+                                CONSTRAINT uq_notification_tvdb_id UNIQUE (email, tvdb_id, season, episode),
+                                CONSTRAINT uq_notification_tmdb_id UNIQUE (email, tmdb_id, season, episode),
+                                CONSTRAINT uq_notification_imdb_id UNIQUE (email, imdb_id, season, episode),
+                                CONSTRAINT uq_notification_plex_guid UNIQUE (email, plex_guid, season, episode)
+                            )
+                        """))
+                        insert_stmt = text("""
+                            INSERT INTO notifications_new (
+                                id,
+                                email,
+                                show_title,
+                                show_key,
+                                show_guid,
+                                tvdb_id,
+                                tmdb_id,
+                                imdb_id,
+                                plex_guid,
+                                send_batch_id,
+                                season,
+                                episode,
+                                episode_title,
+                                episode_key,
+                                timestamp
+                            )
+                            VALUES (
+                                :id,
+                                :email,
+                                :show_title,
+                                :show_key,
+                                :show_guid,
+                                :tvdb_id,
+                                :tmdb_id,
+                                :imdb_id,
+                                :plex_guid,
+                                :send_batch_id,
+                                :season,
+                                :episode,
+                                :episode_title,
+                                :episode_key,
+                                :timestamp
+                            )
+                        """)
+                        for notif in deduped.values():
+                            conn.execute(insert_stmt, {
+                                "id": notif.id,
+                                "email": notif.email,
+                                "show_title": notif.show_title,
+                                "show_key": notif.show_key,
+                                "show_guid": notif.show_guid,
+                                "tvdb_id": notif.tvdb_id,
+                                "tmdb_id": notif.tmdb_id,
+                                "imdb_id": notif.imdb_id,
+                                "plex_guid": notif.plex_guid,
+                                "send_batch_id": notif.send_batch_id,
+                                "season": notif.season,
+                                "episode": notif.episode,
+                                "episode_title": notif.episode_title,
+                                "episode_key": notif.episode_key,
+                                "timestamp": notif.timestamp,
+                            })
+                        conn.execute(text("DROP TABLE notifications"))
+                        conn.execute(text("ALTER TABLE notifications_new RENAME TO notifications"))
+                        conn.execute(text(
+                            "CREATE INDEX idx_email_timestamp ON notifications (email, timestamp)"
+                        ))
+                        conn.execute(text(
+                            "CREATE INDEX ix_notifications_timestamp ON notifications (timestamp)"
+                        ))
+                        conn.execute(text(
+                            "CREATE INDEX idx_notification_email_show_key_guid "
+                            "ON notifications (email, show_key, show_guid)"
+                        ))
+                        conn.execute(text(
+                            "CREATE INDEX idx_notifications_month "
+                            "ON notifications (strftime('%Y-%m', timestamp))"
+                        ))
+                        conn.execute(text(
+                            "CREATE INDEX idx_show_key_season_episode ON notifications (show_key, season, episode)"
+                        ))
+                        conn.execute(text(
+                            "CREATE INDEX idx_show_guid ON notifications (show_guid)"
+                        ))
+                        conn.execute(text(
+                            "CREATE INDEX idx_notification_tvdb_id ON notifications (tvdb_id)"
+                        ))
+                        conn.execute(text(
+                            "CREATE INDEX idx_notification_tmdb_id ON notifications (tmdb_id)"
+                        ))
+                        conn.execute(text(
+                            "CREATE INDEX idx_notification_imdb_id ON notifications (imdb_id)"
+                        ))
+                        conn.execute(text(
+                            "CREATE INDEX idx_notification_plex_guid ON notifications (plex_guid)"
+                        ))
+                        conn.execute(text(
+                            "CREATE INDEX idx_notifications_send_batch_id ON notifications (send_batch_id)"
+                        ))
+                    app.logger.info(
+                        "Rebuilt notifications table with stable-identifier unique constraints."
+                    )
+                    inspector = inspect(db.engine)
+                else:
+                    app.logger.warning(
+                        "Legacy notifications table detected without stable unique constraints. "
+                        "Manual migration required for non-SQLite database."
+                    )
+                    complete = False
+        except Exception as exc:
+            app.logger.warning(f"Could not check notifications constraints: {exc}")
+            complete = False
+
+    return complete
+
+
+def _backfill_notification_identifiers(app: Flask) -> bool:
+    """Fill missing notification identifiers from known show identities.
+
+    Returns False if the backfill failed and should be retried next start.
+    """
+    # Only rows still missing an identifier can change, so skip complete ones.
+    # Collect just their ids and load the rows a batch at a time, so memory is
+    # bounded by the batch rather than by the table.
+    try:
+        pending_ids = db.session.scalars(
+            select(Notification.id)
+            .where(or_(*(
+                func.coalesce(column, "") == ""
+                for column in (
+                    Notification.show_guid,
+                    Notification.tvdb_id,
+                    Notification.tmdb_id,
+                    Notification.imdb_id,
+                    Notification.plex_guid,
+                )
+            )))
+            .order_by(Notification.id)
+        ).all()
+        batch_size = 100
+        for start in range(0, len(pending_ids), batch_size):
+            batch_ids = pending_ids[start:start + batch_size]
+            # Rows deleted as conflicts in an earlier batch simply do not load
+            notifications = Notification.query.filter(Notification.id.in_(batch_ids)).all()
             for notif in notifications:
                 with db.session.no_autoflush:
                     identity = None
@@ -656,7 +967,6 @@ def create_app():
                                 reason,
                             )
                             db.session.delete(notif)
-                            pending_updates += 1
                             continue
                         app.logger.info(
                             "Notification backfill deleted conflicting notification %s: "
@@ -670,7 +980,6 @@ def create_app():
                             reason,
                         )
                         db.session.delete(conflict)
-                        pending_updates += 1
 
                     if target_show_guid and target_show_guid != notif.show_guid:
                         notif.show_guid = target_show_guid
@@ -683,39 +992,245 @@ def create_app():
                     if target_plex_guid and target_plex_guid != notif.plex_guid:
                         notif.plex_guid = target_plex_guid
 
-                if db.session.is_modified(notif, include_collections=False):
-                    pending_updates += 1
-                if pending_updates >= batch_size:
-                    db.session.commit()
-                    pending_updates = 0
-            if pending_updates:
-                db.session.commit()
-        except Exception as exc:
-            app.logger.warning(f"Failed to backfill notification identifiers: {exc}")
-            db.session.rollback()
-        # Backfill show_guid for existing preferences using known Plex identifiers
-        try:
-            show_guid_map = {
-                notif.show_key: notif.show_guid
-                for notif in Notification.query.filter(Notification.show_guid.isnot(None)).all()
-                if notif.show_key
-                and notif.show_guid
-                and not str(notif.show_guid).startswith("title:")
-            }
-            prefs = UserPreferences.query.filter(
+            db.session.commit()
+    except Exception as exc:
+        app.logger.warning(f"Failed to backfill notification identifiers: {exc}")
+        db.session.rollback()
+        return False
+    return True
+
+
+def _backfill_preference_email_norm(app: Flask) -> bool:
+    """Set email_norm to normalize_email(email) on rows where it is missing or stale.
+
+    Done in Python because SQL lower()/trim() only fold ASCII letters and
+    spaces. Returns False if the backfill failed and should be retried next
+    start.
+    """
+    try:
+        rows = db.session.execute(
+            select(UserPreferences.id, UserPreferences.email, UserPreferences.email_norm)
+        ).all()
+        updates = [
+            {"id": row.id, "email_norm": normalize_email(row.email)}
+            for row in rows
+            if row.email_norm != normalize_email(row.email)
+        ]
+        if updates:
+            # Bulk UPDATE by primary key, executed as one executemany
+            db.session.execute(update(UserPreferences), updates)
+        db.session.commit()
+    except Exception as exc:
+        app.logger.warning(f"Failed to backfill normalized preference emails: {exc}")
+        db.session.rollback()
+        return False
+    return True
+
+
+def _backfill_preference_show_guids(app: Flask) -> bool:
+    """Give key-only opt-outs the show GUID their notifications carry.
+
+    Returns False if the backfill failed and should be retried next start.
+    """
+    # One UPDATE instead of loading every notification into Python
+    try:
+        known_guid = and_(
+            Notification.show_key == UserPreferences.show_key,
+            Notification.show_guid.isnot(None),
+            Notification.show_guid != "",
+            ~Notification.show_guid.startswith("title:"),
+        )
+        latest_known_guid = (
+            select(Notification.show_guid)
+            .where(known_guid)
+            .order_by(Notification.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        db.session.execute(
+            update(UserPreferences)
+            .where(
                 UserPreferences.show_guid.is_(None),
-                UserPreferences.show_key.isnot(None)
-            ).all()
-            updates = False
-            for pref in prefs:
-                if pref.show_key in show_guid_map:
-                    pref.show_guid = show_guid_map[pref.show_key]
-                    updates = True
-            if updates:
-                db.session.commit()
-        except Exception as exc:
-            app.logger.warning(f"Failed to backfill show identifiers: {exc}")
-            db.session.rollback()
+                UserPreferences.show_key.isnot(None),
+                UserPreferences.show_key != "",
+                select(Notification.id).where(known_guid).exists(),
+            )
+            .values(show_guid=latest_known_guid)
+            .execution_options(synchronize_session=False)
+        )
+        # Commit even when nothing matched so the write lock is released
+        # before the schema version is stamped
+        db.session.commit()
+    except Exception as exc:
+        app.logger.warning(f"Failed to backfill show identifiers: {exc}")
+        db.session.rollback()
+        return False
+    return True
+
+
+def create_app(instance_path: str | None = None):
+    """Build the app. ``instance_path`` overrides where the database and logs live."""
+    log_format = '%(asctime)s | %(levelname)s | %(name)s | %(message)s'
+    # LOG_LEVEL takes precedence; fall back to DEBUG env var for backwards compatibility
+    log_level_env = os.getenv("LOG_LEVEL", "").strip()
+    if log_level_env:
+        level = _parse_log_level(log_level_env)
+    else:
+        level = logging.DEBUG if os.getenv("DEBUG", "false").lower() == "true" else logging.INFO
+    handler = logging.StreamHandler()
+    handler.setLevel(level)
+    handler.setFormatter(TZFormatter(log_format))
+    logging.basicConfig(level=logging.DEBUG, handlers=[handler])
+
+    # Suppress overly verbose logs
+    logging.getLogger("apscheduler").setLevel(logging.WARNING)
+    logging.getLogger("urllib3.connectionpool").setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    # idx_notifications_month is an expression index, which the inspector cannot
+    # reflect; the startup migration only needs the plain indexes and constraints.
+    warnings.filterwarnings(
+        "ignore",
+        message="Skipped unsupported reflection of expression-based index",
+        category=SAWarning,
+    )
+
+    # Resolve the display time zone once, like TZFormatter does for the logs
+    tz_name = os.environ.get("TZ")
+    display_tz = ZoneInfo(tz_name) if tz_name else None
+
+    app = Flask(__name__, instance_path=instance_path, instance_relative_config=True)
+    app.logger.setLevel(level)
+    # Remove Flask's default handlers to prevent duplicate console output
+    app.logger.handlers.clear()
+    # The notifier writes its own logs here too, so the viewers read what it wrote
+    log_dir = instance_log_dir(app.instance_path)
+    configure_log_dir(log_dir)
+    app_log_path = os.path.join(log_dir, "app.log")
+    if app_log_path not in _app_log_listeners:
+        app_file_handler = BatchedRotatingFileHandler(
+            app_log_path,
+            maxBytes=APP_LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+        )
+        app_file_handler.setFormatter(TZFormatter(log_format))
+        log_queue = queue.SimpleQueue()
+        app_log_listener = BatchingQueueListener(log_queue, app_file_handler, respect_handler_level=True)
+        app_log_listener.start()
+        # Drain whatever is still queued before the interpreter exits
+        atexit.register(app_log_listener.stop)
+        _app_log_listeners[app_log_path] = (QueueHandler(log_queue), app_log_listener)
+    app_log_queue_handler, app_log_listener = _app_log_listeners[app_log_path]
+    root_logger = logging.getLogger()
+    if app_log_queue_handler not in root_logger.handlers:
+        root_logger.addHandler(app_log_queue_handler)
+    app.config['log_listener'] = app_log_listener
+
+    # Asset and log locations never change after startup; resolve them once
+    media_dir = os.path.abspath(os.path.join(app.root_path, "..", "media"))
+    static_dir = os.path.abspath(os.path.join(app.root_path, "static"))
+    icons_dir = os.path.join(static_dir, "icons")
+    admin_log_paths = {
+        "app": app_log_path,
+        "notifications": os.path.join(log_dir, "notifications.log"),
+    }
+
+    @app.route('/media/<path:filename>')
+    def media_file(filename):
+        return send_from_directory(media_dir, filename)
+
+    @app.route('/manifest.webmanifest')
+    def manifest():
+        return send_from_directory(
+            static_dir,
+            "manifest.webmanifest",
+            mimetype="application/manifest+json",
+        )
+
+    @app.route('/icons/<path:filename>')
+    def icon_file(filename):
+        return send_from_directory(icons_dir, filename)
+
+    # Validate SECRET_KEY
+    secret_key = os.environ.get('SECRET_KEY', 'change-me')
+    if secret_key == 'change-me':
+        app.logger.error("=" * 80)
+        app.logger.error("SECURITY ERROR: SECRET_KEY is set to default 'change-me' value!")
+        app.logger.error("Please set a secure SECRET_KEY environment variable.")
+        app.logger.error("You can generate one with: python -c 'import secrets; print(secrets.token_hex(32))'")
+        app.logger.error("=" * 80)
+        raise ValueError("Insecure SECRET_KEY detected. Application will not start.")
+
+    if len(secret_key) < 32:
+        app.logger.warning("!" * 80)
+        app.logger.warning("WARNING: SECRET_KEY is shorter than recommended (32+ characters)")
+        app.logger.warning("!" * 80)
+
+    # SQLite creates the database file on first connect; only the directory
+    # has to exist
+    os.makedirs(app.instance_path, exist_ok=True)
+    db_path = os.path.join(app.instance_path, 'config.sqlite3')
+
+    app.config.from_mapping(
+        SECRET_KEY=secret_key,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SESSION_COOKIE_HTTPONLY=True,
+        SESSION_COOKIE_SAMESITE="Lax",
+        PERMANENT_SESSION_LIFETIME=timedelta(
+            hours=int(os.environ.get("SESSION_LIFETIME_HOURS", "12"))
+        ),
+    )
+
+    # History caches belong to this app's database, like settings_cache
+    app.config['history_stats_cache'] = {}
+    app.config['history_page_cache'] = OrderedDict()
+
+    session_cookie_secure = os.environ.get("SESSION_COOKIE_SECURE")
+    if session_cookie_secure is not None:
+        app.config["SESSION_COOKIE_SECURE"] = session_cookie_secure.lower() == "true"
+
+    # Initialize rate limiter
+    limiter = Limiter(
+        app=app,
+        key_func=get_remote_address,
+        default_limits=["200 per day", "50 per hour"],
+        # memory:// keeps counters per process; point this at redis:// or
+        # memcached:// to share limits across gunicorn workers
+        storage_uri=(
+            os.environ.get("RATELIMIT_STORAGE_URI")
+            or os.environ.get("REDIS_URL")
+            or "memory://"
+        ),
+        # Moving windows stop a client from doubling a limit across a window edge
+        strategy=os.environ.get("RATELIMIT_STRATEGY", "moving-window"),
+    )
+
+    db.init_app(app)
+
+    with app.app_context():
+        event.listen(db.engine, "connect", _apply_sqlite_pragmas)
+
+        # Create all tables (will only create if they don't exist)
+        db.create_all()
+
+        # Handle legacy schema migrations and the one-off data backfills that
+        # follow them. SQLite databases are stamped with PRAGMA user_version once
+        # every step succeeds, so a current database skips all of it.
+        is_sqlite = db.engine.dialect.name == "sqlite"
+        schema_version = 0
+        if is_sqlite:
+            with db.engine.connect() as conn:
+                schema_version = conn.execute(text("PRAGMA user_version")).scalar() or 0
+        if schema_version < SCHEMA_VERSION:
+            migrated = _migrate_schema(app)
+            migrated = _backfill_notification_identifiers(app) and migrated
+            migrated = _backfill_preference_email_norm(app) and migrated
+            migrated = _backfill_preference_show_guids(app) and migrated
+            if migrated and is_sqlite:
+                with db.engine.begin() as conn:
+                    # Refresh planner statistics so new indexes are picked up
+                    conn.execute(text("ANALYZE"))
+                    conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
 
         # Create default settings if none exist
         s = Settings.query.first()
@@ -745,6 +1260,18 @@ def create_app():
         app.config['scheduler'] = sched
         app.logger.info("✅ App initialized successfully.")
 
+    def _get_settings() -> Settings | None:
+        """Return the settings row, cached on the app until /settings saves it."""
+        cached = app.config.get('settings_cache')
+        if cached is not None:
+            return cached
+        s = Settings.query.first()
+        if s is not None:
+            # Detach with its columns loaded so later requests can read it safely
+            db.session.expunge(s)
+            app.config['settings_cache'] = s
+        return s
+
     @app.route('/login', methods=['GET', 'POST'])
     def login():
         form = LoginForm()
@@ -787,6 +1314,7 @@ def create_app():
             s.notify_interval = s.notify_interval or 30
             db.session.add(s)
             db.session.commit()
+            app.config.pop('settings_cache', None)
             flash('Settings saved!', 'success')
 
             sched = app.config.get('scheduler')
@@ -813,7 +1341,7 @@ def create_app():
     @requires_auth
     @limiter.limit(RATE_LIMIT_TEST_EMAIL)
     def send_test_email():
-        s = Settings.query.first()
+        s = _get_settings()
         if not s:
             flash('Please save settings first.', 'warning')
             return redirect(url_for('settings'))
@@ -831,11 +1359,32 @@ def create_app():
 
                 html_body = '<p>If you can read this, your email settings are correct!</p>'
                 msg.attach(MIMEText(html_body, 'html'))
-
-                _send_email(s, msg)
-                flash(f'Test email sent to {form.test_email.data}!', 'success')
             except Exception as e:
                 flash(f'Failed to send test email: {e}', 'danger')
+                return redirect(url_for('settings'))
+
+            def send_async():
+                # SMTP timeouts and retry backoff can take a while; keep them off the request
+                with app.app_context():
+                    if _send_email_with_retry(s, msg):
+                        app.logger.info(f"Test email sent to {redact_email(msg['To'])}")
+
+            sched = app.config.get('scheduler')
+            if sched:
+                # One job per request: a shared id would let a second test email
+                # replace or be skipped behind one still pending
+                sched.add_job(
+                    func=send_async,
+                    trigger='date',
+                    id=f'test_email_{uuid.uuid4().hex}',
+                    misfire_grace_time=None,
+                )
+            else:
+                _fallback_pool("test-email").submit(send_async)
+            flash(
+                f'Test email queued for {form.test_email.data}. Check the log viewer for the result.',
+                'info',
+            )
 
         return redirect(url_for('settings'))
 
@@ -843,7 +1392,7 @@ def create_app():
     @requires_auth
     @limiter.limit(RATE_LIMIT_MANUAL_CHECK)
     def run_check():
-        s = Settings.query.first()
+        s = _get_settings()
         if not s:
             flash('Please save settings first.', 'warning')
             return redirect(url_for('settings'))
@@ -854,13 +1403,39 @@ def create_app():
         if manual_check_form.validate_on_submit():
             time_window_minutes = int(manual_check_form.time_window.data)
 
+        # Held from here until the check finishes, whichever pool runs it; the
+        # scheduled check_job takes the same lock, so checks never overlap and
+        # repeat clicks get a warning instead of silently doing nothing
+        if not check_lock.acquire(blocking=False):
+            flash('A notification check is already running.', 'warning')
+            return redirect(url_for('log_viewer'))
+
         def run_async():
             try:
                 check_new_episodes(app, override_interval_minutes=time_window_minutes)
             except Exception as e:
                 app.logger.error(f"Manual check failed: {e}")
+            finally:
+                check_lock.release()
 
-        threading.Thread(target=run_async).start()
+        sched = app.config.get('scheduler')
+        try:
+            if sched:
+                # No misfire grace limit: a skipped job would never release the lock
+                sched.add_job(
+                    func=run_async,
+                    trigger='date',
+                    id='manual_check',
+                    replace_existing=True,
+                    max_instances=1,
+                    coalesce=True,
+                    misfire_grace_time=None,
+                )
+            else:
+                _fallback_pool("manual-check").submit(run_async)
+        except Exception:
+            check_lock.release()
+            raise
         hours = time_window_minutes / 60
         if hours < 1:
             time_desc = f"{time_window_minutes} minutes"
@@ -882,11 +1457,10 @@ def create_app():
         if not token:
             return render_template("subscriptions.html", email=None)
 
-        try:
-            email = serializer.loads(token, salt="unsubscribe", max_age=86400 * 7)
-            canon = normalize_email(email)
-        except BadSignature:
+        decoded = _load_subscription_token(token)
+        if decoded is None:
             return render_template("subscriptions.html", email=None)
+        email, canon = decoded
 
         if request.method == "POST":
             def _parse_show_token(value: str) -> tuple[str, str]:
@@ -908,13 +1482,12 @@ def create_app():
                 if show_key:
                     visible_show_keys.append(show_key)
 
-            pref = UserPreferences.query.filter_by(email=canon, show_key=None).first()
+            # email_norm matches rows stored under either the raw or canonical address
+            pref = UserPreferences.query.filter_by(email_norm=canon, show_key=None).first()
             if not pref:
-                pref = UserPreferences.query.filter_by(email=email, show_key=None).first()
-                if pref:
-                    pref.email = canon
-                else:
-                    pref = UserPreferences(email=canon)
+                pref = UserPreferences(email=canon)
+            elif pref.email != canon:
+                pref.email = canon
             pref.global_opt_out = global_opt_out
             pref.show_opt_out = False
             db.session.add(pref)
@@ -923,123 +1496,75 @@ def create_app():
             # This preserves opt-outs for shows not currently displayed
             if visible_show_ids or visible_show_keys:
                 UserPreferences.query.filter(
-                    UserPreferences.email.in_([canon, email]),
-                    UserPreferences.show_key.in_(visible_show_keys)
-                ).delete(synchronize_session=False)
-                UserPreferences.query.filter(
-                    UserPreferences.email.in_([canon, email]),
-                    UserPreferences.show_guid.in_(visible_show_ids)
+                    UserPreferences.email_norm == canon,
+                    or_(
+                        UserPreferences.show_key.in_(visible_show_keys),
+                        UserPreferences.show_guid.in_(visible_show_ids),
+                    )
                 ).delete(synchronize_session=False)
 
             # Add opt-outs for checked shows
+            parsed_optouts = {}
             for show_value in show_optouts:
                 show_id, show_key = _parse_show_token(show_value)
-                pref = None
-                if show_id:
-                    pref = UserPreferences.query.filter_by(email=canon, show_guid=show_id).first()
-                if not pref and show_key:
-                    pref = UserPreferences.query.filter_by(email=canon, show_key=show_key).first()
-                if pref:
-                    pref.show_opt_out = True
-                    pref.show_key = show_key or pref.show_key
-                    pref.show_guid = show_id or pref.show_guid
-                else:
-                    db.session.add(UserPreferences(
-                        email=canon,
-                        show_guid=show_id or None,
-                        show_key=show_key,
-                        show_opt_out=True
-                    ))
+                parsed_optouts[show_key or show_id] = (show_id, show_key)
+
+            if parsed_optouts:
+                # One executemany upsert; uq_email_show_key catches any opt-out
+                # row the delete above did not cover
+                optout_insert = sqlite_insert(UserPreferences)
+                db.session.execute(
+                    optout_insert.on_conflict_do_update(
+                        index_elements=["email", "show_key"],
+                        set_={
+                            "show_opt_out": True,
+                            "show_guid": func.coalesce(
+                                optout_insert.excluded.show_guid, UserPreferences.show_guid
+                            ),
+                        },
+                    ),
+                    [
+                        {
+                            "email": canon,
+                            "email_norm": canon,
+                            "show_guid": show_id or None,
+                            "show_key": show_key,
+                            "global_opt_out": False,
+                            "show_opt_out": True,
+                        }
+                        for show_id, show_key in parsed_optouts.values()
+                    ],
+                )
 
             db.session.commit()
             flash("Preferences updated.", "success")
             return redirect(url_for("subscriptions") + f"?token={token}")
 
         # Get pagination and filter parameters
-        page = max(int(request.args.get('page', 1)), 1)
+        page = max(request.args.get('page', 1, type=int), 1)
         per_page = SUBSCRIPTIONS_SHOWS_PER_PAGE
         show_inactive = request.args.get('show_inactive', 'false').lower() == 'true'
         search_query = request.args.get('search', '').strip()
 
-        # Get shows from database notifications (primary source) with last notification date
-        show_map = {}  # key -> {title, last_notified} mapping
-        show_key_lookup = {}
-
-        # Get most recent notification for each show
-        from sqlalchemy import func
-        show_latest = (
-            db.session.query(
-                Notification.show_key,
-                Notification.show_guid,
-                Notification.show_title,
-                func.max(Notification.timestamp).label('last_notified')
-            )
-            .filter_by(email=canon)
-            .group_by(Notification.show_key, Notification.show_guid, Notification.show_title)
-            .all()
-        )
-
-        def _merge_show_entry(target, source):
-            if source.get('last_notified'):
-                if not target.get('last_notified') or source['last_notified'] > target['last_notified']:
-                    target['last_notified'] = source['last_notified']
-            for key in ('show_guid', 'show_key'):
-                if source.get(key) and not target.get(key):
-                    target[key] = source[key]
-            if source.get('title') and not target.get('title'):
-                target['title'] = source['title']
-
-        def _resolve_existing_show_id(show_guid, show_key):
-            if show_guid and show_guid in show_map:
-                return show_guid
-            if show_key and show_key in show_key_lookup:
-                return show_key_lookup[show_key]
-            if show_key and show_key in show_map:
-                return show_key
-            return None
-
-        def _rekey_entry(existing_key, new_key):
-            if existing_key == new_key:
-                return
-            existing_entry = show_map.pop(existing_key)
-            if new_key in show_map:
-                _merge_show_entry(show_map[new_key], existing_entry)
-            else:
-                show_map[new_key] = existing_entry
-            if existing_entry.get("show_key"):
-                show_key_lookup[existing_entry["show_key"]] = new_key
-        for show_key, show_guid, show_title, last_notified in show_latest:
-            existing_id = _resolve_existing_show_id(show_guid, show_key)
-            if show_guid and existing_id and existing_id != show_guid:
-                _rekey_entry(existing_id, show_guid)
-                existing_id = show_guid
-            show_id = existing_id or show_guid or show_key
-            if not show_id:
-                continue
-            current_entry = {
-                'title': show_title,
-                'last_notified': last_notified,
-                'show_guid': show_guid,
-                'show_key': show_key,
-            }
-            if show_id in show_map:
-                _merge_show_entry(show_map[show_id], current_entry)
-            else:
-                show_map[show_id] = current_entry
-            if show_key:
-                show_key_lookup[show_key] = show_id
+        show_map = _load_subscription_shows(canon)
 
         show_key_to_id = {
             info['show_key']: show_id
             for show_id, info in show_map.items()
             if info.get('show_key')
         }
-        user_prefs = UserPreferences.query.filter(
-            UserPreferences.email.in_([canon, email])
+        # Plain column rows are enough here; no need to build ORM objects
+        user_prefs = db.session.execute(
+            select(
+                UserPreferences.id,
+                UserPreferences.show_key,
+                UserPreferences.show_guid,
+                UserPreferences.global_opt_out,
+            ).where(UserPreferences.email_norm == canon)
         ).all()
         global_opt_out = any(p.global_opt_out for p in user_prefs if p.show_key is None)
         opted_out_shows = set()
-        prefs_updated = False
+        guid_updates = []
         for pref in user_prefs:
             if pref.show_key is None:
                 continue
@@ -1047,69 +1572,48 @@ def create_app():
             if not show_id and pref.show_key in show_key_to_id:
                 show_id = show_key_to_id[pref.show_key]
                 mapped_guid = show_map[show_id].get("show_guid")
-                if mapped_guid and pref.show_guid != mapped_guid:
-                    pref.show_guid = mapped_guid
-                    prefs_updated = True
+                if mapped_guid:
+                    guid_updates.append({"id": pref.id, "show_guid": mapped_guid})
             opted_out_shows.add(show_id or pref.show_key)
 
-        if prefs_updated:
+        if guid_updates:
+            # Bulk UPDATE by primary key: one executemany for all backfilled GUIDs
+            db.session.execute(update(UserPreferences), guid_updates)
             db.session.commit()
 
-        # Build list of shows with their opt-out status and last notification date
-        shows_list = []
+        # show_map is already ordered most recent first, so a single pass can
+        # count inactive shows, apply the search and cut out the current page
+        # without building an entry for every show
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=INACTIVE_SHOW_THRESHOLD_DAYS)
+        cutoff_date = cutoff_date.replace(tzinfo=None)  # timestamps are stored as naive UTC
+        search_lower = search_query.lower()
+        start_idx = (page - 1) * per_page
+        end_idx = start_idx + per_page
+        paginated_shows = []
+        inactive_count = 0
+        total_shows = 0
 
         for key, info in show_map.items():
-            # Filter inactive shows unless show_inactive is True
-            if not show_inactive and info['last_notified']:
-                # Make timezone-aware if needed
-                last_notified = info['last_notified']
-                if last_notified.tzinfo is None:
-                    last_notified = last_notified.replace(tzinfo=timezone.utc)
-
-                # Skip shows that haven't notified in the threshold period
-                if last_notified < cutoff_date:
-                    continue
-
-            shows_list.append({
-                'key': key,
-                'show_key': info.get('show_key') or "",
-                'show_guid': info.get('show_guid') or "",
-                'title': info['title'],
-                'opted_out': key in opted_out_shows,
-                'last_notified': info['last_notified']
-            })
-
-        # Sort by most recent notification date (descending), shows without dates at the end
-        shows_list.sort(key=lambda x: x['last_notified'] if x['last_notified'] else datetime.min.replace(tzinfo=timezone.utc), reverse=True)
-
-        # Apply search filter if provided
-        if search_query:
-            shows_list = [
-                show for show in shows_list
-                if search_query.lower() in show['title'].lower()
-            ]
+            last_notified = info['last_notified']
+            # Skip (but count) shows that haven't notified in the threshold period
+            if not show_inactive and last_notified and last_notified < cutoff_date:
+                inactive_count += 1
+                continue
+            if search_lower and search_lower not in info['title'].lower():
+                continue
+            if start_idx <= total_shows < end_idx:
+                paginated_shows.append({
+                    'key': key,
+                    'show_key': info.get('show_key') or "",
+                    'show_guid': info.get('show_guid') or "",
+                    'title': info['title'],
+                    'opted_out': key in opted_out_shows,
+                    'last_notified': last_notified
+                })
+            total_shows += 1
 
-        # Calculate pagination
-        total_shows = len(shows_list)
         total_pages = max((total_shows - 1) // per_page + 1, 1) if total_shows > 0 else 1
 
-        # Get shows for current page
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        paginated_shows = shows_list[start_idx:end_idx]
-
-        # Count inactive shows for display
-        inactive_count = 0
-        if not show_inactive:
-            for key, info in show_map.items():
-                if info['last_notified']:
-                    last_notified = info['last_notified']
-                    if last_notified.tzinfo is None:
-                        last_notified = last_notified.replace(tzinfo=timezone.utc)
-                    if last_notified < cutoff_date:
-                        inactive_count += 1
-
         return render_template(
             "subscriptions.html",
             email=email,
@@ -1128,9 +1632,6 @@ def create_app():
     def health():
         """Public health check endpoint for monitoring."""
         try:
-            # Check database connectivity
-            db.session.execute(text('SELECT 1'))
-
             # Get scheduler status
             sched = app.config.get('scheduler')
             scheduler_running = sched is not None and sched.running
@@ -1141,10 +1642,9 @@ def create_app():
                 if job and job.next_run_time:
                     next_run = job.next_run_time.astimezone().isoformat()
 
-            # Get recent notification count
-            from datetime import timedelta
-            tz = ZoneInfo(os.environ.get("TZ")) if os.environ.get("TZ") else timezone.utc
-            one_hour_ago = datetime.now(tz) - timedelta(hours=1)
+            # Get recent notification count; this query doubles as the database
+            # connectivity check (any failure lands in the except below)
+            one_hour_ago = datetime.now(display_tz or timezone.utc) - timedelta(hours=1)
             recent_notifications = Notification.query.filter(
                 Notification.timestamp >= one_hour_ago
             ).count()
@@ -1169,15 +1669,12 @@ def create_app():
     def admin_logs():
         # Support multiple log files
         log_file_param = request.args.get("file", "app")
-        allowed_files = {
-            "app": "app.log",
-            "notifications": "notifications.log",
-        }
-        log_filename = allowed_files.get(log_file_param, "app.log")
-        log_path = os.path.abspath(os.path.join(app.root_path, "..", "instance", "logs", log_filename))
+        log_path = admin_log_paths.get(log_file_param, app_log_path)
+        log_filename = os.path.basename(log_path)
 
         try:
-            offset_arg = request.args.get("offset", "0")
+            # Without an explicit offset, serve the newest data like a log viewer would
+            offset_arg = request.args.get("offset", "tail")
             start_arg = request.args.get("start")
             tail_requested = offset_arg == "tail" or start_arg == "tail"
             offset = 0 if tail_requested else int(offset_arg)
@@ -1191,91 +1688,114 @@ def create_app():
         except ValueError:
             pass
 
-        if not os.path.exists(log_path):
+        # One stat covers both the existence check and the size
+        try:
+            file_size = os.stat(log_path).st_size
+        except FileNotFoundError:
             return jsonify({
-                "lines": [f"{log_filename} not available yet."],
+                "text": f"{log_filename} not available yet.\n",
                 "offset": 0,
                 "file_size": 0,
                 "ends_with_newline": True,
                 "log_file": log_file_param,
             })
 
-        file_size = os.path.getsize(log_path)
         if tail_requested:
             offset = max(file_size - max_bytes, 0)
         elif offset < 0 or offset > file_size:
             offset = 0
 
+        # The tail window usually starts mid-line; the byte just before it
+        # says whether the first line is partial and has to be dropped
+        starts_mid_line = False
         with open(log_path, "rb") as log_file:
-            log_file.seek(offset)
+            if tail_requested and offset > 0:
+                log_file.seek(offset - 1)
+                starts_mid_line = log_file.read(1) != b"\n"
+            else:
+                log_file.seek(offset)
             chunk = log_file.read(max_bytes)
             new_offset = log_file.tell()
 
-        decoded = chunk.decode("utf-8", errors="replace")
-        lines = decoded.splitlines()
+        if starts_mid_line:
+            first_newline = chunk.find(b"\n")
+            if first_newline != -1:
+                chunk = chunk[first_newline + 1:]
+
+        # Hand back one string; the viewer splits it, so no per-line list is built here
         ends_with_newline = chunk.endswith(b"\n")
         return jsonify({
-            "lines": lines,
+            "text": chunk.decode("utf-8", errors="replace"),
             "offset": new_offset,
             "file_size": file_size,
             "ends_with_newline": ends_with_newline,
             "log_file": log_file_param,
         })
 
+    @app.route('/history/raw')
+    @requires_auth
+    def history_raw():
+        """Serve a user's raw notification log straight from disk."""
+        email = normalize_email(request.args.get("email"))
+        if not email:
+            abort(404)
+        user_log_path = os.path.join(log_dir, f"{email_to_filename(email)}-notification.log")
+        if not os.path.isfile(user_log_path):
+            abort(404)
+        # conditional=True lets Werkzeug answer If-Modified-Since/Range itself and
+        # hand the file to the server's sendfile path instead of reading it here.
+        return send_file(user_log_path, mimetype="text/plain", conditional=True)
+
     @app.route('/')
     @requires_auth
     def history():
-        tz = ZoneInfo(os.environ.get("TZ")) if os.environ.get("TZ") else None
-
-        def fmt_dt(dt: datetime | None):
-            if not dt:
-                return ""
-            # Database stores timestamps as naive UTC datetimes
-            # First mark as UTC, then convert to local timezone
-            if tz and dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc).astimezone(tz)
-            date = dt.strftime("%m/%d/%Y")
-            hour = dt.strftime("%I").lstrip('0') or '0'
-            minute = dt.strftime("%M")
-            ampm = dt.strftime("%p").lower()
-            zone = dt.strftime("%Z") if dt.tzinfo else ""
-            return f"{date} {hour}:{minute}{ampm} {zone}".strip()
-
-        # Get user list from database
-        users = {
-            normalize_email(p.email)
-            for p in UserPreferences.query.with_entities(UserPreferences.email).distinct()
-        }
-        # Also get users from Notification table
-        notif_users = {
-            n.email
-            for n in Notification.query.with_entities(Notification.email).distinct()
-        }
-        users = users.union(notif_users)
-        users = sorted(users)
-
-        # Calculate user counts from database
-        user_counts = {}
-        for u in users:
-            count = Notification.query.filter_by(email=u).count()
-            user_counts[u] = count
-        user_counts = dict(sorted(user_counts.items()))
-
         # Get filter parameters
         selected_raw = request.args.get('email')
         selected = normalize_email(selected_raw) if selected_raw else None
         query = selected
-        page = max(int(request.args.get('page', 1)), 1)
+        page = max(request.args.get('page', 1, type=int), 1)
         per_page = HISTORY_ENTRIES_PER_PAGE
 
+        # Serve an already rendered page while the underlying tables are unchanged
+        fingerprint = _history_fingerprint()
+        today = datetime.now()
+        page_cache_key = (fingerprint, today.date(), selected_raw, page)
+
+        # The same key doubles as an ETag so browsers revalidating an unchanged
+        # page (back navigation, refresh) get a bodiless 304
+        etag = hashlib.sha1(repr(page_cache_key).encode("utf-8")).hexdigest()
+
+        def _history_response(html: str):
+            response = make_response(html)
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+
+        if request.if_none_match.contains(etag):
+            return _history_response("")
+
+        page_cache = app.config['history_page_cache']
+        with _history_page_lock:
+            cached_html = page_cache.get(page_cache_key)
+            if cached_html is not None:
+                page_cache.move_to_end(page_cache_key)
+        if cached_html is not None:
+            return _history_response(cached_html)
+
+        users, user_counts, monthly_totals = _load_history_stats(
+            fingerprint, today, app.config['history_stats_cache']
+        )
+
         # Build database query
         base_query = Notification.query
 
-        if query:
+        # Users matching the email filter; reused by the single-user view below
+        matched_users = [u for u in users if query in normalize_email(u)] if query else []
+
+        if matched_users:
             # Filter to specific users matching query
-            matched_users = [u for u in users if query in normalize_email(u)]
-            if matched_users:
-                base_query = base_query.filter(Notification.email.in_(matched_users))
+            base_query = base_query.filter(Notification.email.in_(matched_users))
 
         notification_group_key = func.coalesce(
             Notification.send_batch_id,
@@ -1292,58 +1812,86 @@ def create_app():
         )
         grouped_subquery = grouped_query.subquery()
 
-        # Get total count for pagination
-        total_count = db.session.query(func.count()).select_from(grouped_subquery).scalar() or 0
-        total_pages = max((total_count - 1) // per_page + 1, 1) if total_count > 0 else 1
-
-        paged_groups = (
-            db.session.query(
-                grouped_subquery.c.group_key,
-                grouped_subquery.c.latest_timestamp,
-            )
-            .order_by(grouped_subquery.c.latest_timestamp.desc())
-            .limit(per_page)
-            .offset((page - 1) * per_page)
-            .subquery()
-        )
-
-        notifications = (
-            db.session.query(Notification, paged_groups.c.group_key, paged_groups.c.latest_timestamp)
-            .join(paged_groups, notification_group_key == paged_groups.c.group_key)
-            .order_by(
-                paged_groups.c.latest_timestamp.desc(),
-                Notification.show_title.asc(),
-                Notification.season.asc(),
-                Notification.episode.asc(),
+        if query and not matched_users:
+            # The email filter matches nobody, so there is nothing to group or count
+            paged_groups = []
+            total_count = 0
+        else:
+            # Fetch the requested page of groups along with the total group count in
+            # one pass; COUNT(*) OVER () is evaluated before LIMIT/OFFSET apply.
+            paged_groups = (
+                db.session.query(
+                    grouped_subquery.c.group_key,
+                    grouped_subquery.c.latest_timestamp,
+                    func.count().over().label("total_count"),
+                )
+                .order_by(grouped_subquery.c.latest_timestamp.desc())
+                .limit(per_page)
+                .offset((page - 1) * per_page)
+                .all()
             )
-            .all()
-        )
+            if paged_groups:
+                total_count = paged_groups[0].total_count
+            elif page > 1:
+                # Past the last page the window has no rows to report the total on
+                total_count = db.session.query(func.count()).select_from(grouped_subquery).scalar() or 0
+            else:
+                total_count = 0
+        total_pages = max((total_count - 1) // per_page + 1, 1) if total_count > 0 else 1
 
         grouped_notifications: dict[str, dict[str, object]] = {}
-        for notif, group_key, latest_timestamp in notifications:
-            if group_key not in grouped_notifications:
-                grouped_notifications[group_key] = {
-                    "notifications": [],
-                    "timestamp": latest_timestamp,
-                    "email": notif.email,
-                }
-            grouped_notifications[group_key]["notifications"].append(notif)
+        if paged_groups:
+            # Match the page's groups on the raw columns rather than the COALESCE
+            # key, so SQLite can seek the send_batch_id index and the primary key
+            # instead of scanning the table. Batch ids are uuid hex, so only
+            # legacy keys carry the prefix.
+            page_batch_ids = []
+            page_legacy_ids = []
+            for row in paged_groups:
+                if row.group_key.startswith("legacy-"):
+                    page_legacy_ids.append(int(row.group_key[len("legacy-"):]))
+                else:
+                    page_batch_ids.append(row.group_key)
+            notifications = (
+                base_query
+                # Only the columns the batch summary and entry line read
+                .with_entities(
+                    Notification.email,
+                    Notification.show_title,
+                    Notification.season,
+                    Notification.episode,
+                    notification_group_key.label("group_key"),
+                )
+                .filter(or_(
+                    Notification.send_batch_id.in_(page_batch_ids),
+                    and_(
+                        Notification.send_batch_id.is_(None),
+                        Notification.id.in_(page_legacy_ids),
+                    ),
+                ))
+                .order_by(
+                    Notification.show_title.asc(),
+                    Notification.season.asc(),
+                    Notification.episode.asc(),
+                )
+                .all()
+            )
+            for notif in notifications:
+                grouped_notifications.setdefault(
+                    notif.group_key, {"notifications": [], "email": notif.email}
+                )["notifications"].append(notif)
 
         entries = []
-        for row in (
-            db.session.query(paged_groups.c.group_key, paged_groups.c.latest_timestamp)
-            .order_by(paged_groups.c.latest_timestamp.desc())
-            .all()
-        ):
+        for row in paged_groups:
             group = grouped_notifications.get(row.group_key)
             if not group:
                 continue
             summary = _build_history_batch_summary(group["notifications"])
             message = f"Sent to {group['email']} | Episodes: {summary}"
             entries.append({
-                'time': fmt_dt(group["timestamp"]),
+                'time': _fmt_dt(row.latest_timestamp, display_tz),
                 'message': message,
-                'dt': group["timestamp"],
+                'dt': row.latest_timestamp,
             })
 
         # Get user preferences for single user view
@@ -1354,76 +1902,61 @@ def create_app():
         prev_user = None
         next_user = None
 
-        if query:
-            matched_users = [u for u in users if query in normalize_email(u)]
-            if len(matched_users) == 1:
-                single_user = True
-                u = matched_users[0]
-                prefs = UserPreferences.query.filter_by(email=u).all()
-                global_opt_out = any(p.global_opt_out for p in prefs if p.show_key is None)
-
-                # Get show titles from notifications for opted-out shows
-                show_map = {}
-                user_notifs = Notification.query.filter_by(email=u).limit(100).all()
-                for n in user_notifs:
-                    if n.show_key not in show_map:
-                        show_map[n.show_key] = {
-                            "title": n.show_title,
-                            "show_key": n.show_key,
-                            "show_guid": n.show_guid,
-                        }
+        # matched_users is empty without a query, so no separate query check is needed
+        if len(matched_users) == 1:
+            single_user = True
+            u = matched_users[0]
+            # One round-trip: each show preference carries the title and GUID
+            # of the user's newest notification for that show, each an index
+            # seek on show_key. email_norm also finds prefs stored under a
+            # differently cased address, as the user list itself does.
+            def _latest_notification_column(column):
+                return (
+                    select(column)
+                    .where(
+                        Notification.email == u,
+                        Notification.show_key == UserPreferences.show_key,
+                    )
+                    .order_by(Notification.id.desc())
+                    .limit(1)
+                    .scalar_subquery()
+                )
 
-                opted_out = []
-                for p in prefs:
-                    if not p.show_key:
-                        continue
-                    info = show_map.get(p.show_key)
-                    if info:
-                        opted_out.append({
-                            "title": info["title"],
-                            "show_key": info["show_key"],
-                            "show_guid": info.get("show_guid") or p.show_guid or "",
-                        })
-                    else:
-                        opted_out.append({
-                            "title": p.show_key,
-                            "show_key": p.show_key,
-                            "show_guid": p.show_guid or "",
-                        })
-
-                # Generate subscription token for this user
-                subscription_token = serializer.dumps(u, salt="unsubscribe")
-
-                # Calculate prev/next users for navigation
-                if users:
-                    user_list = list(users)
-                    try:
-                        current_idx = user_list.index(u)
-                        if current_idx > 0:
-                            prev_user = user_list[current_idx - 1]
-                        if current_idx < len(user_list) - 1:
-                            next_user = user_list[current_idx + 1]
-                    except ValueError:
-                        pass
-
-        # Calculate monthly stats from database
-        today = datetime.now()
-        months_ago_limit = MONTHLY_STATS_MONTHS
-        cutoff_date = today.replace(year=today.year - 1)
-
-        monthly_stats = db.session.query(
-            db.func.strftime('%Y-%m', Notification.timestamp).label('month'),
-            db.func.count(Notification.id).label('count')
-        ).filter(
-            Notification.timestamp >= cutoff_date
-        ).group_by('month').all()
-
-        monthly_totals = [
-            (datetime.strptime(month, "%Y-%m").strftime("%b %Y"), count)
-            for month, count in sorted(monthly_stats)
-        ]
+            prefs = db.session.execute(
+                select(
+                    UserPreferences.show_key,
+                    UserPreferences.show_guid,
+                    UserPreferences.global_opt_out,
+                    _latest_notification_column(Notification.show_title).label("notified_title"),
+                    _latest_notification_column(Notification.show_guid).label("notified_guid"),
+                ).where(UserPreferences.email_norm == u)
+            ).all()
+            global_opt_out = any(p.global_opt_out for p in prefs if p.show_key is None)
+
+            # Shows the user never got a notification for fall back to their key
+            opted_out = [
+                {
+                    "title": p.notified_title or p.show_key,
+                    "show_key": p.show_key,
+                    "show_guid": p.notified_guid or p.show_guid or "",
+                }
+                for p in prefs
+                if p.show_key
+            ]
 
-        return render_template(
+            # Generate subscription token for this user
+            subscription_token = serializer.dumps(u, salt="unsubscribe")
+
+            # Calculate prev/next users for navigation; users comes back
+            # sorted from _load_history_stats, so bisect finds u directly
+            current_idx = bisect.bisect_left(users, u)
+            if current_idx < len(users) and users[current_idx] == u:
+                if current_idx > 0:
+                    prev_user = users[current_idx - 1]
+                if current_idx < len(users) - 1:
+                    next_user = users[current_idx + 1]
+
+        html = render_template(
             'history.html',
             email=query,
             selected=selected_raw,
@@ -1440,6 +1973,12 @@ def create_app():
             prev_user=prev_user,
             next_user=next_user,
         )
+        with _history_page_lock:
+            page_cache[page_cache_key] = html
+            page_cache.move_to_end(page_cache_key)
+            while len(page_cache) > HISTORY_PAGE_CACHE_SIZE:
+                page_cache.popitem(last=False)
+        return _history_response(html)
 
     register_debug_route(app)
     return app
@@ -0,0 +1,66 @@
+import logging
+
+import pytest
+
+
+@pytest.fixture
+def app_options():
+    """Arguments for ``make_app`` used by ``app_client``; override per module."""
+    return {}
+
+
+@pytest.fixture
+def make_app(monkeypatch, tmp_path):
+    """Build apps on a throwaway instance directory (database and logs).
+
+    Calling it again reopens the same directory, like restarting the app.
+    ``scheduler`` is what ``start_scheduler`` returns; extra keyword
+    arguments go into ``app.config``.
+    """
+    monkeypatch.setenv("SECRET_KEY", "testing-secret-key-that-is-long-enough-123")
+    monkeypatch.setenv("WEBUI_USER", "admin")
+    monkeypatch.setenv("WEBUI_PASS", "pass")
+
+    from notifier_app import webapp
+
+    monkeypatch.setattr(webapp, "reconcile_notifications", lambda app, run_reason=None: None)
+    monkeypatch.setattr(
+        webapp,
+        "reconcile_user_preferences",
+        lambda app, run_reason=None, cutoff_days=None: None,
+    )
+    # Module-level caches outlive an app; start every test from empty ones
+    webapp._subscription_token_cache.clear()
+    webapp._subscription_show_cache.clear()
+
+    instance_path = str(tmp_path / "instance")
+
+    def _make(scheduler=None, **config):
+        monkeypatch.setattr(webapp, "start_scheduler", lambda app, interval: scheduler)
+        app = webapp.create_app(instance_path=instance_path)
+        app.config.update(TESTING=True, **config)
+        return app
+
+    yield _make
+
+    # Detach the log writers this test's instance dirs installed
+    root_logger = logging.getLogger()
+    for log_path in [p for p in webapp._app_log_listeners if p.startswith(str(tmp_path))]:
+        queue_handler, listener = webapp._app_log_listeners.pop(log_path)
+        root_logger.removeHandler(queue_handler)
+        listener.stop()
+    for logger in logging.Logger.manager.loggerDict.values():
+        for handler in getattr(logger, "handlers", [])[:]:
+            if getattr(handler, "baseFilename", "").startswith(str(tmp_path)):
+                logger.removeHandler(handler)
+                handler.close()
+
+
+@pytest.fixture
+def app_client(make_app, app_options):
+    app = make_app(**app_options)
+
+    with app.test_client() as client:
+        with client.session_transaction() as session:
+            session["admin_authed"] = True
+        yield app, client
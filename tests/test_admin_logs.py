@@ -1,58 +1,99 @@
-import pytest
 from pathlib import Path
 
 
-@pytest.fixture
-def app_client(monkeypatch):
-    monkeypatch.setenv("SECRET_KEY", "testing-secret-key-that-is-long-enough-123")
-    monkeypatch.setenv("WEBUI_USER", "admin")
-    monkeypatch.setenv("WEBUI_PASS", "pass")
-
-    from notifier_app import webapp
-
-    monkeypatch.setattr(webapp, "start_scheduler", lambda app, interval: None)
-    monkeypatch.setattr(webapp, "reconcile_notifications", lambda app, run_reason=None: None)
-    monkeypatch.setattr(
-        webapp,
-        "reconcile_user_preferences",
-        lambda app, run_reason=None, cutoff_days=None: None,
-    )
-
-    app = webapp.create_app()
-    app.config.update(TESTING=True)
-
-    with app.test_client() as client:
-        with client.session_transaction() as session:
-            session["admin_authed"] = True
-        yield app, client
+def _log_path(app, name):
+    return Path(app.instance_path) / "logs" / name
 
 
 def test_admin_logs_tail_returns_recent_chunk(app_client):
     app, client = app_client
 
-    log_path = Path(app.root_path).parent / "instance" / "logs" / "app.log"
-    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log_path = _log_path(app, "notifications.log")
 
     first_line = "A" * 1500
     second_line = "tail-line-visible"
     content = f"{first_line}\n{second_line}\n"
     log_path.write_text(content, encoding="utf-8")
 
-    response = client.get("/api/admin/logs?file=app&offset=tail&max_bytes=1000")
+    response = client.get("/api/admin/logs?file=notifications&offset=tail&max_bytes=1000")
     assert response.status_code == 200
 
     data = response.get_json()
     assert data["offset"] == len(content.encode("utf-8"))
-    assert second_line in data["lines"]
+    assert data["text"] == f"{second_line}\n"
 
 
 def test_admin_logs_invalid_offset_falls_back_to_start(app_client):
     app, client = app_client
-    log_path = Path(app.root_path).parent / "instance" / "logs" / "app.log"
+    log_path = _log_path(app, "notifications.log")
     log_path.write_text("first\nsecond\n", encoding="utf-8")
 
-    response = client.get("/api/admin/logs?file=app&offset=oops")
+    response = client.get("/api/admin/logs?file=notifications&offset=oops")
     assert response.status_code == 200
 
     data = response.get_json()
-    assert data["lines"] == ["first", "second"]
+    assert data["text"] == "first\nsecond\n"
+
+
+def test_admin_logs_defaults_to_tail(app_client):
+    app, client = app_client
+    log_path = _log_path(app, "notifications.log")
+    log_path.write_text("".join(f"line {i:04d}\n" for i in range(200)), encoding="utf-8")
+
+    response = client.get("/api/admin/logs?file=notifications&max_bytes=1000")
+    assert response.status_code == 200
+
+    data = response.get_json()
+    lines = data["text"].splitlines()
+    assert lines[-1] == "line 0199"
+    assert all(line.startswith("line ") and len(line) == 9 for line in lines)
+
+
+def _wait_for_marker(log_path, marker):
+    import time
+
+    deadline = time.monotonic() + 5
+    while not log_path.exists() or marker not in log_path.read_text(encoding="utf-8"):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_root_logging_reaches_app_log_through_listener(app_client):
+    import logging
+
+    app, client = app_client
+    assert app.config["log_listener"] is not None
+    log_path = _log_path(app, "app.log")
+    assert app.config["log_listener"].handlers[0].baseFilename == str(log_path)
+
+    logging.getLogger("notifier_app.test").warning("queued-log-line-marker")
+    _wait_for_marker(log_path, "queued-log-line-marker")
+
+    data = client.get("/api/admin/logs?file=app").get_json()
+    assert "queued-log-line-marker" in data["text"]
+
+
+def test_each_instance_gets_its_own_app_log(make_app, tmp_path):
+    import logging
+    from notifier_app import webapp
+
+    first = make_app()
+    second = webapp.create_app(instance_path=str(tmp_path / "other-instance"))
+    assert first.config["log_listener"] is not second.config["log_listener"]
+
+    logging.getLogger("notifier_app.test").warning("per-instance-marker")
+    _wait_for_marker(_log_path(first, "app.log"), "per-instance-marker")
+    _wait_for_marker(_log_path(second, "app.log"), "per-instance-marker")
+
+
+def test_admin_logs_tail_keeps_line_starting_at_window_edge(app_client):
+    app, client = app_client
+    log_path = _log_path(app, "notifications.log")
+
+    # The 1000-byte tail window starts exactly at the beginning of "kept"
+    content = "x" * 99 + "\n" + "kept" + "y" * 995 + "\n"
+    log_path.write_text(content, encoding="utf-8")
+
+    response = client.get("/api/admin/logs?file=notifications&offset=tail&max_bytes=1000")
+    data = response.get_json()
+    assert data["text"].startswith("kepty")
@@ -0,0 +1,354 @@
+from pathlib import Path
+
+
+def test_history_raw_serves_user_log(app_client):
+    app, client = app_client
+    from notifier_app.utils import email_to_filename
+
+    email = "raw-viewer@example.com"
+    log_path = Path(app.instance_path) / "logs" / f"{email_to_filename(email)}-notification.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log_path.write_text("first | Notified: Show [Key:1] S01E01\n", encoding="utf-8")
+
+    try:
+        response = client.get("/history/raw?email=Raw-Viewer@Example.com")
+        assert response.status_code == 200
+        assert response.mimetype == "text/plain"
+        assert b"Notified: Show" in response.data
+
+        cached = client.get(
+            "/history/raw?email=raw-viewer@example.com",
+            headers={"If-Modified-Since": response.headers["Last-Modified"]},
+        )
+        assert cached.status_code == 304
+        response.close()
+        cached.close()
+    finally:
+        log_path.unlink()
+
+
+def test_notifier_logs_land_where_the_viewers_read(app_client):
+    app, client = app_client
+    from notifier_app import notifier
+    from notifier_app.logging_utils import instance_log_dir
+
+    notifier.notif_logger.info("notifier-log-marker")
+    user_log = notifier.get_user_logger("viewer@example.com", instance_log_dir(app.instance_path))
+    user_log.info("user-log-marker")
+
+    logs = client.get("/api/admin/logs?file=notifications").get_json()
+    assert "notifier-log-marker" in logs["text"]
+    raw = client.get("/history/raw?email=viewer@example.com")
+    assert b"user-log-marker" in raw.data
+    raw.close()
+
+
+def test_history_raw_missing_log_returns_404(app_client):
+    _, client = app_client
+
+    response = client.get("/history/raw?email=nobody@example.com")
+    assert response.status_code == 404
+
+
+def _add_notification(email, show_title="Show", season=1, episode=1, timestamp=None):
+    from datetime import datetime, timezone
+    from notifier_app.config import db, Notification
+
+    notif = Notification(
+        email=email,
+        show_title=show_title,
+        show_key=f"key-{show_title}",
+        show_guid=f"guid-{show_title}",
+        season=season,
+        episode=episode,
+        timestamp=timestamp or datetime.now(timezone.utc),
+    )
+    db.session.add(notif)
+    db.session.commit()
+    return notif
+
+
+def test_history_stats_refresh_after_new_notification(app_client):
+    app, client = app_client
+
+    with app.app_context():
+        _add_notification("counts@example.com", episode=1)
+
+    response = client.get("/")
+    assert response.status_code == 200
+    assert b"1 emails" in response.data
+
+    with app.app_context():
+        _add_notification("counts@example.com", episode=2)
+
+    response = client.get("/")
+    assert b"2 emails" in response.data
+
+
+def test_history_lists_preference_only_users_by_canonical_email(app_client):
+    app, client = app_client
+    from notifier_app.config import db, UserPreferences
+
+    with app.app_context():
+        pref = UserPreferences(email="  Mixed.Case@Example.com ", global_opt_out=True)
+        db.session.add(pref)
+        db.session.commit()
+        assert pref.email_norm == "mixed.case@example.com"
+
+    response = client.get("/")
+    assert response.status_code == 200
+    assert b"mixed.case@example.com" in response.data
+
+
+def test_fmt_dt_converts_naive_utc_to_local_time():
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+    from notifier_app.webapp import _fmt_dt
+
+    stamp = datetime(2024, 1, 31, 1, 5)
+    assert _fmt_dt(stamp, ZoneInfo("America/Chicago")) == "01/30/2024 7:05pm CST"
+    assert _fmt_dt(stamp) == "01/31/2024 1:05am"
+    assert _fmt_dt(None) == ""
+
+
+def test_history_page_cache_tracks_preference_toggles(app_client):
+    app, client = app_client
+    from notifier_app.config import db, UserPreferences
+
+    with app.app_context():
+        _add_notification("toggle@example.com")
+        db.session.add(UserPreferences(email="toggle@example.com", global_opt_out=False))
+        db.session.commit()
+
+    response = client.get("/?email=toggle@example.com")
+    assert b"No - Receiving notifications" in response.data
+    assert client.get("/?email=toggle@example.com").data == response.data
+
+    with app.app_context():
+        pref = UserPreferences.query.filter_by(email="toggle@example.com").first()
+        pref.global_opt_out = True
+        db.session.commit()
+
+    response = client.get("/?email=toggle@example.com")
+    assert b"Yes - Not receiving any notifications" in response.data
+
+
+def test_history_page_cache_tracks_opposite_preference_toggles(app_client):
+    app, client = app_client
+    from notifier_app.config import db, UserPreferences
+
+    with app.app_context():
+        _add_notification("swap-a@example.com")
+        _add_notification("swap-b@example.com")
+        db.session.add(UserPreferences(email="swap-a@example.com", global_opt_out=True))
+        db.session.add(UserPreferences(email="swap-b@example.com", global_opt_out=False))
+        db.session.commit()
+
+    response = client.get("/?email=swap-a@example.com")
+    assert b"Yes - Not receiving any notifications" in response.data
+
+    # One opts back in while the other opts out: the opted-out count is unchanged
+    with app.app_context():
+        for pref in UserPreferences.query.all():
+            pref.global_opt_out = not pref.global_opt_out
+        db.session.commit()
+
+    response = client.get("/?email=swap-a@example.com")
+    assert b"No - Receiving notifications" in response.data
+
+
+def test_history_paginates_grouped_notifications(app_client):
+    app, client = app_client
+    from datetime import datetime, timedelta, timezone
+    from notifier_app.constants import HISTORY_ENTRIES_PER_PAGE
+
+    now = datetime.now(timezone.utc)
+    with app.app_context():
+        for idx in range(HISTORY_ENTRIES_PER_PAGE + 1):
+            _add_notification(
+                "pages@example.com",
+                show_title=f"Paged {idx:02d}",
+                timestamp=now - timedelta(minutes=idx),
+            )
+
+    first = client.get("/").get_data(as_text=True)
+    assert "Paged 00" in first
+    assert f"Paged {HISTORY_ENTRIES_PER_PAGE:02d}" not in first
+    assert 'href="/?page=2"' in first
+
+    second = client.get("/?page=2").get_data(as_text=True)
+    assert f"Paged {HISTORY_ENTRIES_PER_PAGE:02d}" in second
+    assert "Paged 00 " not in second
+
+
+def test_history_monthly_stats_cover_last_twelve_months(app_client):
+    app, client = app_client
+    from datetime import datetime, timedelta
+
+    now = datetime.now()
+    recent = now - timedelta(days=330)
+    stale = now - timedelta(days=430)
+    with app.app_context():
+        _add_notification("months@example.com", show_title="Recent", timestamp=recent)
+        _add_notification("months@example.com", show_title="Stale", timestamp=stale)
+
+    body = client.get("/").get_data(as_text=True)
+    assert recent.strftime("%b %Y") in body
+    assert stale.strftime("%b %Y") not in body
+
+
+def test_history_lists_opted_out_show_titles(app_client):
+    app, client = app_client
+    from notifier_app.config import db, UserPreferences
+
+    with app.app_context():
+        _add_notification("optout@example.com", show_title="Kept Show")
+        _add_notification("optout@example.com", show_title="Dropped Show")
+        db.session.add(UserPreferences(
+            email="optout@example.com",
+            show_key="key-Dropped Show",
+            show_opt_out=True,
+        ))
+        db.session.commit()
+
+    body = client.get("/?email=optout@example.com").get_data(as_text=True)
+    assert "Opted-Out Shows" in body
+    assert "GUID: guid-Dropped Show" in body
+    assert "GUID: guid-Kept Show" not in body
+
+
+def test_history_revalidates_with_etag(app_client):
+    app, client = app_client
+
+    with app.app_context():
+        _add_notification("etag@example.com")
+
+    response = client.get("/")
+    etag = response.headers["ETag"]
+    assert "private" in response.headers["Cache-Control"]
+
+    cached = client.get("/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+    with app.app_context():
+        _add_notification("etag@example.com", episode=2)
+
+    refreshed = client.get("/", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etag
+
+
+def test_history_single_user_reads_prefs_by_canonical_email(app_client):
+    app, client = app_client
+    from notifier_app.config import db, UserPreferences
+
+    with app.app_context():
+        _add_notification("cased@example.com", show_title="Cased Show")
+        db.session.add(UserPreferences(email="Cased@Example.com", global_opt_out=True))
+        db.session.add(UserPreferences(
+            email="Cased@Example.com",
+            show_key="key-Cased Show",
+            show_opt_out=True,
+        ))
+        db.session.commit()
+
+    body = client.get("/?email=cased@example.com").get_data(as_text=True)
+    assert "Yes - Not receiving any notifications" in body
+    assert "GUID: guid-Cased Show" in body
+
+
+def test_history_single_user_links_to_neighbouring_users(app_client):
+    app, client = app_client
+
+    with app.app_context():
+        for email in ("a-nav@example.com", "b-nav@example.com", "c-nav@example.com"):
+            _add_notification(email)
+
+    body = client.get("/?email=b-nav@example.com").get_data(as_text=True)
+    assert "email=a-nav%40example.com" in body or "email=a-nav@example.com" in body
+    assert "email=c-nav%40example.com" in body or "email=c-nav@example.com" in body
+
+
+def test_history_groups_notifications_by_send_batch(app_client):
+    app, client = app_client
+    from notifier_app.config import db
+
+    with app.app_context():
+        first = _add_notification("batch@example.com", show_title="Batch Show", episode=1)
+        second = _add_notification("batch@example.com", show_title="Batch Show", episode=2)
+        _add_notification("batch@example.com", show_title="Loose Show", episode=1)
+        first.send_batch_id = second.send_batch_id = "0123456789abcdef"
+        db.session.commit()
+
+    body = client.get("/?email=batch@example.com").get_data(as_text=True)
+    assert body.count("Sent to batch@example.com") == 2
+    assert "Batch Show" in body
+    assert "Loose Show" in body
+
+
+def test_history_filter_matching_nobody_lists_no_entries(app_client):
+    app, client = app_client
+
+    with app.app_context():
+        _add_notification("someone@example.com")
+
+    body = client.get("/?email=nobody-here@example.com").get_data(as_text=True)
+    assert "Sent to someone@example.com" not in body
+    assert "Sent to someone@example.com" in client.get("/").get_data(as_text=True)
+
+
+def test_history_ignores_non_numeric_page(app_client):
+    _, client = app_client
+
+    assert client.get("/?page=abc").status_code == 200
+
+
+def test_history_caches_are_scoped_to_the_app(app_client, tmp_path):
+    app, client = app_client
+    from notifier_app import webapp
+
+    assert client.get("/").status_code == 200
+    assert app.config["history_page_cache"]
+
+    other = webapp.create_app(instance_path=str(tmp_path / "other-instance"))
+    assert other.config["history_page_cache"] == {}
+    assert other.config["history_stats_cache"] == {}
+
+
+def test_history_page_cache_tracks_in_place_edits(app_client):
+    app, client = app_client
+    from sqlalchemy import update
+    from notifier_app import webapp
+    from notifier_app.config import db, Notification, UserPreferences
+
+    with app.app_context():
+        notif_id = _add_notification("edits@example.com", show_title="Old Title").id
+        db.session.add(UserPreferences(email="edits@example.com", show_key="key-old"))
+        db.session.commit()
+
+    assert b"Old Title" in client.get("/").data
+
+    with app.app_context():
+        db.session.get(Notification, notif_id).show_title = "New Title"
+        db.session.commit()
+    assert b"New Title" in client.get("/").data
+
+    with app.app_context():
+        before = webapp._history_fingerprint()
+        db.session.execute(
+            update(UserPreferences)
+            .where(UserPreferences.email == "edits@example.com")
+            .values(show_guid="plex://show/edited")
+        )
+        assert webapp._history_fingerprint() == before
+        db.session.commit()
+        after = webapp._history_fingerprint()
+        assert after != before
+
+        Notification.query.all()
+        db.session.commit()
+        db.session.get(Notification, notif_id).show_title = "Discarded"
+        db.session.flush()
+        db.session.rollback()
+        assert webapp._history_fingerprint() == after
@@ -0,0 +1,71 @@
+import logging
+import queue
+
+
+def _record(msg, level=logging.INFO):
+    return logging.LogRecord("test", level, __file__, 1, msg, None, None)
+
+
+def test_batched_handler_defers_writes_until_flush(tmp_path):
+    from notifier_app.logging_utils import BatchedRotatingFileHandler
+
+    log_path = tmp_path / "app.log"
+    handler = BatchedRotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=1)
+    try:
+        handler.handle(_record("first"))
+        handler.handle(_record("second"))
+        assert log_path.read_text() == ""
+
+        handler.flush()
+        assert log_path.read_text() == "first\nsecond\n"
+    finally:
+        handler.close()
+
+
+def test_batching_listener_flushes_on_error_and_stop(tmp_path):
+    from notifier_app.logging_utils import BatchedRotatingFileHandler, BatchingQueueListener
+
+    log_path = tmp_path / "app.log"
+    handler = BatchedRotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=1)
+    log_queue = queue.SimpleQueue()
+    listener = BatchingQueueListener(log_queue, handler)
+    try:
+        log_queue.put(_record("info"))
+        log_queue.put(_record("boom", logging.ERROR))
+        log_queue.put(_record("after"))
+        listener.start()
+        listener.stop()
+        assert log_path.read_text() == "info\nboom\nafter\n"
+    finally:
+        handler.close()
+
+
+def test_batched_handler_still_rotates(tmp_path):
+    from notifier_app.logging_utils import BatchedRotatingFileHandler
+
+    log_path = tmp_path / "app.log"
+    handler = BatchedRotatingFileHandler(log_path, maxBytes=20, backupCount=1)
+    try:
+        for idx in range(4):
+            handler.handle(_record(f"line-{idx}"))
+        handler.flush()
+        assert (tmp_path / "app.log.1").read_text() == "line-0\nline-1\n"
+        assert log_path.read_text() == "line-2\nline-3\n"
+    finally:
+        handler.close()
+
+
+def test_batched_handler_rotates_on_encoded_size(tmp_path):
+    from notifier_app.logging_utils import BatchedRotatingFileHandler
+
+    log_path = tmp_path / "app.log"
+    handler = BatchedRotatingFileHandler(log_path, maxBytes=20, backupCount=1, encoding="utf-8")
+    try:
+        # Seven characters but thirteen bytes each
+        for _ in range(2):
+            handler.handle(_record("é" * 6))
+        handler.flush()
+        assert (tmp_path / "app.log.1").read_text(encoding="utf-8") == "éééééé\n"
+        assert log_path.read_text(encoding="utf-8") == "éééééé\n"
+    finally:
+        handler.close()
@@ -0,0 +1,158 @@
+import pytest
+
+
+class FakeScheduler:
+    running = True
+
+    def __init__(self):
+        self.jobs = []
+
+    def add_job(self, **kwargs):
+        self.jobs.append(kwargs)
+
+    def reschedule_job(self, job_id, **kwargs):
+        self.jobs.append(dict(kwargs, id=job_id))
+
+
+@pytest.fixture
+def app_options():
+    return {"scheduler": FakeScheduler(), "WTF_CSRF_ENABLED": False}
+
+
+def test_run_check_queues_single_manual_job_on_scheduler(app_client, monkeypatch):
+    app, client = app_client
+    from notifier_app import webapp
+
+    calls = []
+    monkeypatch.setattr(
+        webapp,
+        "check_new_episodes",
+        lambda app, override_interval_minutes=None: calls.append(override_interval_minutes),
+    )
+
+    response = client.post("/run-check", data={"time_window": "360"})
+    assert response.status_code == 302
+
+    jobs = app.config["scheduler"].jobs
+    assert len(jobs) == 1
+    job = jobs[0]
+    assert job["id"] == "manual_check"
+    assert job["trigger"] == "date"
+    assert job["max_instances"] == 1
+
+    response = client.post("/run-check", data={"time_window": "60"}, follow_redirects=True)
+    assert b"A notification check is already running." in response.data
+    assert len(jobs) == 1
+
+    job["func"]()
+    assert calls == [360]
+    assert not webapp.check_lock.locked()
+
+
+def test_settings_row_is_cached_until_saved(app_client, monkeypatch):
+    app, client = app_client
+    from notifier_app import webapp
+
+    monkeypatch.setattr(webapp, "check_new_episodes", lambda app, override_interval_minutes=None: None)
+
+    def run_check():
+        client.post("/run-check", data={"time_window": "60"})
+        app.config["scheduler"].jobs.pop()["func"]()
+
+    run_check()
+    cached = app.config["settings_cache"]
+    assert cached.plex_url
+
+    run_check()
+    assert app.config["settings_cache"] is cached
+
+    client.post("/settings", data={
+        "plex_url": "http://plex.example.com:32400",
+        "plex_token": "saved-token",
+        "notify_interval": 45,
+    })
+    assert "settings_cache" not in app.config
+
+    run_check()
+    assert app.config["settings_cache"].plex_token == "saved-token"
+
+
+def test_test_email_is_sent_from_a_scheduler_job(app_client, monkeypatch):
+    app, client = app_client
+    from notifier_app import webapp
+
+    sent = []
+    monkeypatch.setattr(
+        webapp,
+        "_send_email_with_retry",
+        lambda s, msg: sent.append(msg["To"]) or True,
+    )
+
+    response = client.post("/test-email", data={"test_email": "tester@example.com"})
+    assert response.status_code == 302
+    assert sent == []
+
+    response = client.post("/test-email", data={"test_email": "second@example.com"})
+    assert response.status_code == 302
+
+    jobs = app.config["scheduler"].jobs
+    assert len(jobs) == 2
+    assert all(job["id"].startswith("test_email_") for job in jobs)
+    assert jobs[0]["id"] != jobs[1]["id"]
+    for job in jobs:
+        job["func"]()
+    assert sent == ["tester@example.com", "second@example.com"]
+
+
+def test_run_check_without_scheduler_allows_one_check_at_a_time(app_client, monkeypatch):
+    import threading
+    app, client = app_client
+    from notifier_app import webapp
+
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_check(app, override_interval_minutes=None):
+        calls.append(override_interval_minutes)
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(webapp, "check_new_episodes", slow_check)
+    app.config["scheduler"] = None
+
+    client.post("/run-check", data={"time_window": "60"})
+    assert started.wait(5)
+
+    response = client.post("/run-check", data={"time_window": "60"}, follow_redirects=True)
+    assert b"A notification check is already running." in response.data
+
+    # A test email does not wait behind the running check
+    sent = threading.Event()
+    monkeypatch.setattr(webapp, "_send_email_with_retry", lambda s, msg: sent.set() or True)
+    client.post("/test-email", data={"test_email": "tester@example.com"})
+    assert sent.wait(5)
+
+    release.set()
+    webapp._fallback_pool("manual-check").submit(lambda: None).result(5)
+    assert calls == [60]
+    assert not webapp.check_lock.locked()
+
+
+def test_scheduled_and_manual_checks_share_one_lock(app_client, monkeypatch):
+    app, client = app_client
+    from notifier_app import notifier, webapp
+
+    calls = []
+    monkeypatch.setattr(notifier, "check_new_episodes", lambda app: calls.append("scheduled"))
+
+    with notifier.check_lock:
+        notifier._run_scheduled_check(app)
+        response = client.post("/run-check", data={"time_window": "60"}, follow_redirects=True)
+        assert b"A notification check is already running." in response.data
+    assert calls == []
+    assert app.config["scheduler"].jobs == []
+
+    notifier._run_scheduled_check(app)
+    assert calls == ["scheduled"]
+    assert not webapp.check_lock.locked()
@@ -0,0 +1,231 @@
+def _unstamp(app):
+    """Reset the schema version so the next start runs the upgrade path."""
+    from sqlalchemy import text
+    from notifier_app.config import db
+
+    with app.app_context():
+        db.session.execute(text("PRAGMA user_version = 0"))
+        db.session.commit()
+
+
+def test_startup_backfills_missing_notification_identifiers(make_app):
+    from datetime import datetime, timezone
+    from notifier_app.config import db, Notification, ShowIdentity
+
+    app = make_app()
+    with app.app_context():
+        db.session.add(ShowIdentity(
+            show_guid="plex://show/backfill",
+            show_key="backfill-key",
+            tvdb_id="12345",
+            tmdb_id="678",
+            imdb_id="tt0001",
+            plex_guid="plex://show/backfill",
+        ))
+        db.session.add(Notification(
+            email="backfill@example.com",
+            show_title="Backfill Show",
+            show_key="backfill-key",
+            season=1,
+            episode=1,
+            timestamp=datetime.now(timezone.utc),
+        ))
+        db.session.commit()
+    _unstamp(app)
+
+    app = make_app()
+    with app.app_context():
+        notif = Notification.query.filter_by(email="backfill@example.com").one()
+        assert notif.show_guid == "plex://show/backfill"
+        assert notif.tvdb_id == "12345"
+        assert notif.imdb_id == "tt0001"
+        assert notif.plex_guid == "plex://show/backfill"
+
+
+def test_schema_migration_is_skipped_once_database_is_stamped(make_app, monkeypatch):
+    from sqlalchemy import text
+    from notifier_app import webapp
+    from notifier_app.config import db
+    from notifier_app.constants import SCHEMA_VERSION
+
+    app = make_app()
+    with app.app_context():
+        assert db.session.execute(text("PRAGMA user_version")).scalar() == SCHEMA_VERSION
+
+    def _fail(app):
+        raise AssertionError("startup migration should not run on a current database")
+
+    monkeypatch.setattr(webapp, "_migrate_schema", _fail)
+    monkeypatch.setattr(webapp, "_backfill_notification_identifiers", _fail)
+    monkeypatch.setattr(webapp, "_backfill_preference_show_guids", _fail)
+    make_app()
+
+
+def test_sqlite_connections_use_wal(make_app):
+    from sqlalchemy import text
+    from notifier_app.constants import SQLITE_CACHE_SIZE_KIB
+    from notifier_app.config import db
+
+    app = make_app()
+    with app.app_context():
+        assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.session.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert db.session.execute(text("PRAGMA cache_size")).scalar() == -SQLITE_CACHE_SIZE_KIB
+
+
+def test_startup_backfills_preference_show_guid_from_notifications(make_app):
+    from datetime import datetime, timezone
+    from notifier_app.config import db, Notification, UserPreferences
+
+    app = make_app()
+    with app.app_context():
+        for episode, guid in ((1, "plex://show/older"), (2, "plex://show/newer"), (3, "title:pref show")):
+            db.session.add(Notification(
+                email="prefs@example.com",
+                show_title="Pref Show",
+                show_key="pref-key",
+                show_guid=guid,
+                tvdb_id="1",
+                tmdb_id="1",
+                imdb_id="tt1",
+                plex_guid=guid,
+                season=1,
+                episode=episode,
+                timestamp=datetime.now(timezone.utc),
+            ))
+        db.session.add(UserPreferences(email="prefs@example.com", show_key="pref-key", show_opt_out=True))
+        db.session.add(UserPreferences(email="prefs@example.com", show_key="other-key", show_opt_out=True))
+        db.session.commit()
+    _unstamp(app)
+
+    app = make_app()
+    with app.app_context():
+        prefs = {p.show_key: p.show_guid for p in UserPreferences.query.all()}
+        assert prefs == {"pref-key": "plex://show/newer", "other-key": None}
+
+
+def test_migration_replaces_email_show_key_index(make_app):
+    from sqlalchemy import text
+    from notifier_app.config import db
+
+    app = make_app()
+    with app.app_context():
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_notification_email_show_key ON notifications (email, show_key)"
+        ))
+        db.session.commit()
+    _unstamp(app)
+
+    app = make_app()
+    with app.app_context():
+        indexes = {row[1] for row in db.session.execute(text("PRAGMA index_list('notifications')"))}
+        assert "idx_notification_email_show_key_guid" in indexes
+        assert "idx_notification_email_show_key" not in indexes
+        assert db.session.execute(text(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        )).scalar() == 1
+
+
+def test_identifier_backfill_spans_multiple_batches(make_app):
+    from datetime import datetime, timezone
+    from notifier_app.config import db, Notification, ShowIdentity
+
+    app = make_app()
+    with app.app_context():
+        db.session.add(ShowIdentity(show_guid="plex://show/many", show_key="many-key", tvdb_id="999"))
+        db.session.add_all([
+            Notification(
+                email="many@example.com",
+                show_title="Many Show",
+                show_key="many-key",
+                season=1,
+                episode=episode,
+                timestamp=datetime.now(timezone.utc),
+            )
+            for episode in range(1, 251)
+        ])
+        db.session.commit()
+    _unstamp(app)
+
+    app = make_app()
+    with app.app_context():
+        notifications = Notification.query.filter_by(email="many@example.com").all()
+        assert len(notifications) == 250
+        assert {(n.show_guid, n.tvdb_id) for n in notifications} == {("plex://show/many", "999")}
+
+
+def test_legacy_notifications_rebuild_keeps_send_batch_id(make_app, tmp_path):
+    import sqlite3
+    from sqlalchemy import text
+    from notifier_app.config import db
+
+    # A pre-identifier notifications table with no unique constraints forces
+    # the table rebuild on startup
+    db_path = tmp_path / "instance" / "config.sqlite3"
+    db_path.parent.mkdir(parents=True)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE notifications (
+                id INTEGER PRIMARY KEY,
+                email VARCHAR NOT NULL,
+                show_title VARCHAR NOT NULL,
+                show_key VARCHAR NOT NULL,
+                season INTEGER NOT NULL,
+                episode INTEGER NOT NULL,
+                episode_title VARCHAR,
+                episode_key VARCHAR,
+                timestamp DATETIME NOT NULL
+            )
+        """)
+        conn.execute(
+            "INSERT INTO notifications (email, show_title, show_key, season, episode, timestamp) "
+            "VALUES ('legacy@example.com', 'Legacy Show', 'legacy-key', 1, 1, '2024-01-01 00:00:00')"
+        )
+    conn.close()
+
+    app = make_app()
+    with app.app_context():
+        columns = {row[1] for row in db.session.execute(text("PRAGMA table_info('notifications')"))}
+        indexes = {row[1] for row in db.session.execute(text("PRAGMA index_list('notifications')"))}
+        assert "send_batch_id" in columns
+        assert "idx_notifications_send_batch_id" in indexes
+
+    with app.test_client() as client:
+        with client.session_transaction() as session:
+            session["admin_authed"] = True
+        response = client.get("/")
+        assert response.status_code == 200
+        assert b"Legacy Show" in response.data
+
+
+def test_startup_backfills_email_norm_with_normalize_email(make_app):
+    from sqlalchemy import text
+    from notifier_app.config import db, UserPreferences
+    from notifier_app.utils import normalize_email
+
+    app = make_app()
+    with app.app_context():
+        db.session.add(UserPreferences(email="\tÜser@Example.COM ", global_opt_out=True))
+        db.session.add(UserPreferences(email="Missing@Example.com", global_opt_out=True))
+        db.session.commit()
+        # What the old SQL lower(trim()) backfill produced, and a row it never reached
+        db.session.execute(text(
+            "UPDATE user_preferences SET email_norm = 'Üser@example.com' WHERE email LIKE '%xample.COM%'"
+        ))
+        db.session.execute(text(
+            "UPDATE user_preferences SET email_norm = NULL WHERE email = 'Missing@Example.com'"
+        ))
+        db.session.execute(text(
+            "CREATE INDEX ix_user_preferences_email_norm ON user_preferences (email_norm)"
+        ))
+        db.session.commit()
+    _unstamp(app)
+
+    app = make_app()
+    with app.app_context():
+        prefs = UserPreferences.query.all()
+        assert {p.email_norm for p in prefs} == {normalize_email(p.email) for p in prefs}
+        assert {p.email_norm for p in prefs} == {"üser@example.com", "missing@example.com"}
+        indexes = {row[1] for row in db.session.execute(text("PRAGMA index_list('user_preferences')"))}
+        assert "ix_user_preferences_email_norm" not in indexes
+        assert "idx_email_norm_show_key" in indexes
@@ -0,0 +1,236 @@
+import re
+from datetime import datetime, timezone
+
+
+def _token(email):
+    from notifier_app.webapp import serializer
+
+    return serializer.dumps(email, salt="unsubscribe")
+
+
+def _add_notification(email, show_title, show_key, show_guid, timestamp=None):
+    from notifier_app.config import db, Notification
+
+    db.session.add(Notification(
+        email=email,
+        show_title=show_title,
+        show_key=show_key,
+        show_guid=show_guid,
+        season=1,
+        episode=1,
+        timestamp=timestamp or datetime.now(timezone.utc),
+    ))
+    db.session.commit()
+
+
+def test_post_updates_preferences_stored_under_raw_email(app_client):
+    app, client = app_client
+    from notifier_app.config import db, UserPreferences
+
+    with app.app_context():
+        db.session.add(UserPreferences(email="Viewer@Example.com", global_opt_out=False))
+        db.session.commit()
+
+    response = client.post("/subscriptions", data={
+        "token": _token("Viewer@Example.com"),
+        "global_opt_out": "on",
+        "visible_shows": ["guid-a::key-a", "guid-b::key-b"],
+        "show_optouts": ["guid-a::key-a", "guid-b::key-b", "guid-b::key-b"],
+    })
+    assert response.status_code == 302
+
+    with app.app_context():
+        prefs = UserPreferences.query.filter_by(email_norm="viewer@example.com").all()
+        global_prefs = [p for p in prefs if p.show_key is None]
+        assert len(global_prefs) == 1
+        assert global_prefs[0].email == "viewer@example.com"
+        assert global_prefs[0].global_opt_out is True
+        assert sorted(p.show_key for p in prefs if p.show_opt_out) == ["key-a", "key-b"]
+
+
+def test_get_marks_opted_out_shows(app_client):
+    app, client = app_client
+
+    with app.app_context():
+        _add_notification("fan@example.com", "Show A", "key-a", "guid-a")
+        _add_notification("fan@example.com", "Show B", "key-b", "guid-b")
+
+    token = _token("fan@example.com")
+    client.post("/subscriptions", data={
+        "token": token,
+        "visible_shows": ["guid-a::key-a", "guid-b::key-b"],
+        "show_optouts": ["guid-b::key-b"],
+    })
+
+    response = client.get(f"/subscriptions?token={token}")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert "Show A" in body
+    assert re.search(r'value="guid-b::key-b"\s+checked', body)
+    assert not re.search(r'value="guid-a::key-a"\s+checked', body)
+
+
+def test_invalid_token_renders_empty_page(app_client):
+    _, client = app_client
+
+    response = client.get("/subscriptions?token=not-a-real-token")
+    assert response.status_code == 200
+    assert b"Show A" not in response.data
+
+
+def test_subscription_token_decoding_is_memoized(app_client, monkeypatch):
+    from notifier_app import webapp
+
+    token = _token("Memo@Example.com")
+    calls = []
+    original_loads = webapp.serializer.loads
+
+    def counting_loads(*args, **kwargs):
+        calls.append(args[0])
+        return original_loads(*args, **kwargs)
+
+    monkeypatch.setattr(webapp.serializer, "loads", counting_loads)
+
+    assert webapp._load_subscription_token(token) == ("Memo@Example.com", "memo@example.com")
+    assert webapp._load_subscription_token(token) == ("Memo@Example.com", "memo@example.com")
+    assert calls == [token]
+
+
+def test_cached_subscription_token_still_expires(app_client, monkeypatch):
+    from notifier_app import webapp
+
+    token = _token("Expiring@Example.com")
+    assert webapp._load_subscription_token(token) == ("Expiring@Example.com", "expiring@example.com")
+
+    monkeypatch.setattr(webapp, "SUBSCRIPTION_TOKEN_MAX_AGE_SECONDS", -1)
+    assert token in webapp._subscription_token_cache
+    assert webapp._load_subscription_token(token) is None
+
+
+def test_get_paginates_most_recent_shows_first(app_client):
+    app, client = app_client
+    from datetime import timedelta
+    from notifier_app.constants import SUBSCRIPTIONS_SHOWS_PER_PAGE
+
+    now = datetime.now(timezone.utc)
+    total = SUBSCRIPTIONS_SHOWS_PER_PAGE + 2
+    with app.app_context():
+        for idx in range(total):
+            _add_notification(
+                "pager@example.com",
+                f"Paged Show {idx:02d}",
+                f"key-{idx}",
+                f"guid-{idx}",
+                timestamp=now - timedelta(hours=idx),
+            )
+
+    token = _token("pager@example.com")
+    first_page = client.get(f"/subscriptions?token={token}").get_data(as_text=True)
+    second_page = client.get(f"/subscriptions?token={token}&page=2").get_data(as_text=True)
+
+    assert first_page.index("Paged Show 00") < first_page.index("Paged Show 01")
+    assert f"Paged Show {total - 1:02d}" not in first_page
+    assert f"Paged Show {total - 2:02d}" in second_page
+    assert f"Paged Show {total - 1:02d}" in second_page
+    assert "Paged Show 00" not in second_page
+
+    searched = client.get(f"/subscriptions?token={token}&search=show 05").get_data(as_text=True)
+    assert "Paged Show 05" in searched
+    assert "Paged Show 00" not in searched
+
+
+def test_subscription_show_map_is_cached_per_subscriber(app_client):
+    app, _ = app_client
+    from notifier_app import webapp
+
+    with app.app_context():
+        _add_notification("cached@example.com", "Show A", "key-a", "guid-a")
+        first = webapp._load_subscription_shows("cached@example.com")
+        assert list(first) == ["guid-a"]
+
+        _add_notification("cached@example.com", "Show B", "key-b", "guid-b")
+        assert webapp._load_subscription_shows("cached@example.com") is first
+
+        webapp._subscription_show_cache.clear()
+        assert set(webapp._load_subscription_shows("cached@example.com")) == {"guid-a", "guid-b"}
+
+
+def test_post_upserts_opt_out_for_existing_show_row(app_client):
+    app, client = app_client
+    from notifier_app.config import db, UserPreferences
+
+    with app.app_context():
+        db.session.add(UserPreferences(email="upsert@example.com", show_key="key-c", show_opt_out=False))
+        db.session.commit()
+
+    response = client.post("/subscriptions", data={
+        "token": _token("upsert@example.com"),
+        "visible_shows": ["guid-a::key-a"],
+        "show_optouts": ["guid-c::key-c"],
+    })
+    assert response.status_code == 302
+
+    with app.app_context():
+        rows = UserPreferences.query.filter_by(email_norm="upsert@example.com", show_key="key-c").all()
+        assert len(rows) == 1
+        assert rows[0].show_opt_out is True
+        assert rows[0].show_guid == "guid-c"
+
+
+def test_get_hides_and_counts_inactive_shows(app_client):
+    app, client = app_client
+    from datetime import timedelta
+    from notifier_app.constants import INACTIVE_SHOW_THRESHOLD_DAYS
+
+    stale = datetime.now(timezone.utc) - timedelta(days=INACTIVE_SHOW_THRESHOLD_DAYS + 5)
+    with app.app_context():
+        _add_notification("idle@example.com", "Fresh Show", "key-fresh", "guid-fresh")
+        _add_notification("idle@example.com", "Stale Show", "key-stale", "guid-stale", timestamp=stale)
+
+    token = _token("idle@example.com")
+    body = client.get(f"/subscriptions?token={token}").get_data(as_text=True)
+    assert "Fresh Show" in body
+    assert "Stale Show" not in body
+    assert "<strong>1</strong> inactive show hidden" in body
+
+    body = client.get(f"/subscriptions?token={token}&show_inactive=true").get_data(as_text=True)
+    assert "Stale Show" in body
+
+
+def test_get_backfills_guid_for_key_only_opt_out(app_client):
+    app, client = app_client
+    from notifier_app.config import db, UserPreferences
+
+    with app.app_context():
+        _add_notification("keyonly@example.com", "Keyed Show", "key-k", "guid-k")
+        db.session.add(UserPreferences(email="keyonly@example.com", show_key="key-k", show_opt_out=True))
+        db.session.commit()
+
+    token = _token("keyonly@example.com")
+    body = client.get(f"/subscriptions?token={token}").get_data(as_text=True)
+    assert re.search(r'value="guid-k::key-k"\s+checked', body)
+
+    with app.app_context():
+        pref = UserPreferences.query.filter_by(email_norm="keyonly@example.com", show_key="key-k").one()
+        assert pref.show_guid == "guid-k"
+
+
+def test_subscription_show_map_is_ordered_most_recent_first(app_client):
+    app, _ = app_client
+    from datetime import timedelta
+    from notifier_app import webapp
+
+    now = datetime.now(timezone.utc)
+    with app.app_context():
+        _add_notification("order@example.com", "Old Show", "key-old", "guid-old", timestamp=now - timedelta(days=2))
+        _add_notification("order@example.com", "New Show", "key-new", "guid-new", timestamp=now)
+        _add_notification("order@example.com", "Mid Show", "key-mid", "guid-mid", timestamp=now - timedelta(days=1))
+
+        assert list(webapp._load_subscription_shows("order@example.com")) == ["guid-new", "guid-mid", "guid-old"]
+
+
+def test_get_ignores_non_numeric_page(app_client):
+    _, client = app_client
+
+    response = client.get(f"/subscriptions?token={_token('pages@example.com')}&page=abc")
+    assert response.status_code == 200